@@ -7,6 +7,10 @@ from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from alembic import context
+from alembic.runtime.environment import (
+    NameFilterParentNames,
+    NameFilterType,
+)
 
 from src.db.model.base import Base
 from src.db.config import SQLALCHEMY_DATABASE_URL
@@ -16,11 +20,13 @@ from src.db.config import SQLALCHEMY_DATABASE_URL
 # as that adds needed metadata to Base
 from src.db.model.training import (  # noqa # type: ignore
     DBTraining,
+    DBRanking,
     DBScore,
     DBGoal,
     DBMultimedia,
 )
 from src.db.model.favorite import DBFavorite  # noqa # type: ignore
+from src.db.search import SEARCH_TABLE
 
 
 # this is the Alembic Config object, which provides
@@ -29,8 +35,9 @@ config = context.config
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
+# Existing loggers are left enabled, as migrations also run in the app.
 if config.config_file_name is not None:
-    fileConfig(config.config_file_name)
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -49,6 +56,19 @@ config.set_section_option(
 )
 
 
+def include_name(
+    name: Optional[str],
+    type_: NameFilterType,
+    parent_names: NameFilterParentNames,
+) -> bool:
+    """Leaves the search index (and FTS5's shadow tables) out of
+    autogenerate, as it isn't described by the models"""
+    if type_ == "table" and name is not None:
+        return not name.startswith(SEARCH_TABLE)
+
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -68,6 +88,7 @@ def run_migrations_offline() -> None:
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
         render_as_batch=True,
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -79,6 +100,7 @@ def do_run_migrations(connection: Connection) -> None:
         connection=connection,
         target_metadata=target_metadata,
         render_as_batch=True,
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -0,0 +1,49 @@
+"""add training score aggregates
+
+Revision ID: 11f3748326e6
+Revises: 05d989a5a5c7
+Create Date: 2026-10-18 10:12:41.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "11f3748326e6"
+down_revision = "05d989a5a5c7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("trainings", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "score_sum", sa.Integer(), server_default="0", nullable=False
+            )
+        )
+        batch_op.add_column(
+            sa.Column(
+                "score_count", sa.Integer(), server_default="0", nullable=False
+            )
+        )
+
+    # backfill aggregates from existing scores
+    op.execute(
+        "UPDATE trainings SET "
+        "score_sum = COALESCE(("
+        "SELECT SUM(training_scores.score) FROM training_scores "
+        "WHERE training_scores.training_id = trainings.id"
+        "), 0), "
+        "score_count = ("
+        "SELECT COUNT(*) FROM training_scores "
+        "WHERE training_scores.training_id = trainings.id"
+        ")"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("trainings", schema=None) as batch_op:
+        batch_op.drop_column("score_count")
+        batch_op.drop_column("score_sum")
@@ -0,0 +1,75 @@
+"""add training search
+
+Revision ID: 3dd33a2cfa4a
+Revises: 7f7ab9e1d152
+Create Date: 2026-10-18 09:12:44.120953
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "3dd33a2cfa4a"
+down_revision = "7f7ab9e1d152"
+branch_labels = None
+depends_on = None
+
+
+# NOTE: the search index isn't a model, see src/db/search.py
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.create_table(
+            "training_search",
+            sa.Column("training_id", sa.Integer(), nullable=False),
+            sa.Column("document", postgresql.TSVECTOR(), nullable=False),
+            sa.ForeignKeyConstraint(["training_id"], ["trainings.id"]),
+            sa.PrimaryKeyConstraint("training_id"),
+        )
+        op.create_index(
+            "ix_training_search_document",
+            "training_search",
+            ["document"],
+            postgresql_using="gin",
+        )
+        op.execute(
+            """
+            INSERT INTO training_search (training_id, document)
+            SELECT
+                t.id,
+                setweight(to_tsvector('simple', t.title), 'A')
+                || setweight(to_tsvector('simple', t.description), 'B')
+                || setweight(to_tsvector('simple', coalesce((
+                    SELECT string_agg(g.name, ' ')
+                    FROM training_goals g WHERE g.training_id = t.id
+                ), '')), 'C')
+            FROM trainings t
+            """
+        )
+        return
+
+    op.execute(
+        """
+        CREATE VIRTUAL TABLE training_search USING fts5(
+            title, description, goals,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO training_search (rowid, title, description, goals)
+        SELECT t.id, t.title, t.description, coalesce((
+            SELECT group_concat(g.name, ' ')
+            FROM training_goals g WHERE g.training_id = t.id
+        ), '')
+        FROM trainings t
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("training_search")
@@ -0,0 +1,48 @@
+import os
+from typing import Any, Hashable, Tuple
+
+from src.api.model.training import Training
+from src.cache import LRUCache
+
+
+TRAINING_CACHE_SIZE = int(os.getenv("TRAINING_CACHE_SIZE") or 1024)
+TRAINING_CACHE_TTL = float(os.getenv("TRAINING_CACHE_TTL") or 60)
+LISTING_CACHE_SIZE = int(os.getenv("LISTING_CACHE_SIZE") or 256)
+LISTING_CACHE_TTL = float(os.getenv("LISTING_CACHE_TTL") or 30)
+
+# NOTE: each replica has its own cache, and only sees its own writes.
+# The TTL bounds how long other replicas may serve a stale training
+training_cache: LRUCache[int, Tuple[str, bytes]] = LRUCache(
+    "trainings", TRAINING_CACHE_SIZE, TRAINING_CACHE_TTL
+)
+"""ETags and serialized trainings, by ID"""
+
+
+listing_cache: LRUCache[Hashable, Any] = LRUCache(
+    "listings", LISTING_CACHE_SIZE, LISTING_CACHE_TTL
+)
+"""Listing and count results, by catalogue version and normalized filters"""
+
+_catalogue_version = 0
+
+
+def serialize_training(training: Training) -> bytes:
+    return training.json(by_alias=True).encode()
+
+
+def listing_key(*args: Hashable) -> Tuple[Hashable, ...]:
+    """Key of a listing with the given arguments in the current catalogue.
+    Entries of older catalogues are never read again, and get evicted"""
+    return (_catalogue_version, *args)
+
+
+def invalidate_catalogue() -> None:
+    """Drops all cached listings. Call after any change to the trainings"""
+    global _catalogue_version
+    _catalogue_version += 1
+
+
+def invalidate_training(id: int) -> None:
+    """Drops all cached data of the training. Call after editing it"""
+    training_cache.invalidate(id)
+    invalidate_catalogue()
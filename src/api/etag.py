@@ -0,0 +1,33 @@
+from hashlib import sha256
+from http import HTTPStatus
+
+from fastapi import Request, Response
+
+
+ETAG_HEADER = "ETag"
+
+
+def make_etag(*versions: object) -> str:
+    """Strong ETag of a representation built from the given versions of
+    its resources"""
+    digest = sha256(repr(versions).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def is_fresh(request: Request, etag: str) -> bool:
+    """Returns True if the client's copy, named by If-None-Match, is still
+    the current one"""
+    header = request.headers.get("If-None-Match")
+
+    if header is None:
+        return False
+
+    # If-None-Match uses the weak comparison
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=HTTPStatus.NOT_MODIFIED, headers={ETAG_HEADER: etag}
+    )
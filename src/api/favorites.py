@@ -1,15 +1,20 @@
 from http import HTTPStatus
-from typing import Annotated, Callable, List
-from fastapi import APIRouter, Depends
+from typing import Annotated, Callable, List, Union
+from fastapi import APIRouter, Depends, Request, Response
 
 from src.api.aliases import SessionDep, UserDep
+from src.api.cache import invalidate_training
 from src.api.model.favorites import FavoriteRequest
-from src.api.model.training import Training
+from src.api.model.training import PageParams, Training
+from src.api.etag import ETAG_HEADER, is_fresh, make_etag, not_modified
+from src.api.fields import parse_fields, sparse_response
+from src.api.pagination import decode_cursor, set_next_cursor
 from src.auth import get_user
 from src.db.utils import get_session
 import src.db.favorites as favorites_db
 from src.logging import info
 from src.metrics.reports import get_training_favorited_reporter
+from src.related import RELATED
 
 
 router = APIRouter(
@@ -18,17 +23,47 @@ router = APIRouter(
     dependencies=[Depends(get_session), Depends(get_user)],
 )
 
+Page = Annotated[PageParams, Depends()]
 FavoritedReporterDep = Annotated[
     Callable[[int, int], None], Depends(get_training_favorited_reporter)
 ]
 
 
-@router.get("")
+@router.get("", response_model=List[Training])
 async def get_favorites(
-    session: SessionDep, user: UserDep, offset: int = 0, limit: int = 100
-) -> List[Training]:
+    session: SessionDep,
+    user: UserDep,
+    page: Page,
+    request: Request,
+    response: Response,
+) -> Union[List[Training], Response]:
     """Get all your favorited trainings"""
-    return await favorites_db.get_favorites(session, offset, limit, user.sub)
+    fields = parse_fields(page.fields)
+    after = decode_cursor(page.cursor)
+
+    # the page's versions are cheap to get, and tell if the client is
+    # up to date before loading the trainings
+    versions = await favorites_db.get_favorite_versions(
+        session, page.offset, page.limit, user.sub, after
+    )
+    # sorted, as sets' order changes between processes
+    etag = make_etag(versions, None if fields is None else sorted(fields))
+
+    if is_fresh(request, etag):
+        return not_modified(etag)
+
+    trainings = await favorites_db.get_favorites(
+        session, page.offset, page.limit, user.sub, after, fields
+    )
+
+    if fields is not None:
+        # a returned response doesn't get the injected response's headers
+        response = sparse_response(trainings)
+
+    response.headers[ETAG_HEADER] = etag
+    set_next_cursor(response, trainings, page.limit)
+
+    return trainings if fields is None else response
 
 
 @router.post("", status_code=HTTPStatus.CREATED)
@@ -39,7 +74,11 @@ async def favorite(
     favorite: FavoriteRequest,
 ) -> FavoriteRequest:
     """Favorite this training"""
-    await favorites_db.favorite(session, user.sub, favorite.training_id)
+    if await favorites_db.favorite(session, user.sub, favorite.training_id):
+        # its favorite count changed
+        invalidate_training(favorite.training_id)
+        RELATED.add(user.sub, favorite.training_id)
+
     info(f"User {user.sub} favorited training {favorite.training_id}")
     report_favorited(user.sub, favorite.training_id)
     return favorite
@@ -51,5 +90,7 @@ async def unfavorite(
 ) -> FavoriteRequest:
     """Un-favorite this training"""
     await favorites_db.unfavorite(session, user.sub, training_id)
+    invalidate_training(training_id)
+    RELATED.remove(user.sub, training_id)
     info(f"User {user.sub} un-favorited training {training_id}")
     return FavoriteRequest(training_id=training_id)
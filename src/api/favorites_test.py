@@ -1,10 +1,23 @@
+from datetime import datetime, timedelta
 from http import HTTPStatus
 from httpx import AsyncClient
+from sqlalchemy import update
 
 from src.api.model.training import (
     Training,
 )
-from src.test_utils import assert_returns_empty
+from src.api.etag import ETAG_HEADER
+from src.api.pagination import NEXT_CURSOR_HEADER
+from src.db.model.favorite import DBFavorite
+from src.db.session import SessionLocal
+from src.test_utils import (
+    as_user,
+    assert_returns_empty,
+    count_statements,
+    create_trainings,
+    get_training_ids,
+    post_as,
+)
 
 
 async def test_empty_favorites(check_empty_favorites: None) -> None:
@@ -29,6 +42,51 @@ async def test_get_favorite(
     assert response.json() == all_trainings
 
 
+async def test_get_favorites_sparse_fields(
+    favorited_training: Training, client: AsyncClient
+) -> None:
+    response = await client.get("/favorites", params={"fields": "title"})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == [
+        {"id": favorited_training.id, "title": favorited_training.title}
+    ]
+
+
+async def test_get_favorites_etag(
+    favorited_training: Training, client: AsyncClient
+) -> None:
+    response = await client.get("/favorites")
+    assert response.status_code == HTTPStatus.OK
+    etag = response.headers[ETAG_HEADER]
+
+    headers = {"If-None-Match": etag}
+    with count_statements() as statements:
+        response = await client.get("/favorites", headers=headers)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers[ETAG_HEADER] == etag
+    assert len(statements) == 1
+
+    # sparse responses are different representations
+    params = {"fields": "title,type"}
+    response = await client.get("/favorites", params=params, headers=headers)
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers[ETAG_HEADER] != etag
+
+    sparse = {"If-None-Match": response.headers[ETAG_HEADER]}
+    params = {"fields": "type,title"}
+    response = await client.get("/favorites", params=params, headers=sparse)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    response = await client.post(
+        f"/trainings/{favorited_training.id}/scores", json={"score": 3}
+    )
+    assert response.status_code == HTTPStatus.CREATED
+
+    response = await client.get("/favorites", headers=headers)
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers[ETAG_HEADER] != etag
+
+
 async def test_delete_favorite(
     favorited_training: Training, client: AsyncClient
 ) -> None:
@@ -41,3 +99,119 @@ async def test_delete_favorite(
     response = await client.get("/trainings")
     assert response.status_code == HTTPStatus.OK
     assert len(response.json()) == 1
+
+
+async def test_get_favorites_constant_statements(client: AsyncClient) -> None:
+    trainings = await create_trainings(client, 10)
+    for training in trainings:
+        json = {"training_id": training.id}
+        response = await client.post("/favorites", json=json)
+        assert response.status_code == HTTPStatus.CREATED
+
+    with count_statements() as small_page:
+        response = await client.get("/favorites", params={"limit": 1})
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json()) == 1
+
+    with count_statements() as big_page:
+        response = await client.get("/favorites", params={"limit": 10})
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json()) == 10
+
+    # versions, trainings + one batched query per child collection
+    assert len(small_page) == len(big_page) == 4
+
+    cursor = response.headers[NEXT_CURSOR_HEADER]
+    response = await client.get("/favorites", params={"cursor": cursor})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == []
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+async def test_favorite_twice(
+    favorited_training: Training, client: AsyncClient
+) -> None:
+    json = {"training_id": favorited_training.id}
+    with count_statements() as statements:
+        response = await client.post("/favorites", json=json)
+    assert response.status_code == HTTPStatus.CREATED
+    assert len(statements) == 1
+
+    response = await client.get("/favorites")
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json()) == 1
+
+
+async def test_favorite_missing_training(
+    check_empty_favorites: None, client: AsyncClient
+) -> None:
+    response = await client.post("/favorites", json={"training_id": 1})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+    await assert_returns_empty(client, "/favorites")
+
+
+async def test_delete_missing_favorite(
+    favorited_training: Training, client: AsyncClient
+) -> None:
+    response = await client.delete(f"/favorites/{favorited_training.id}")
+    assert response.status_code == HTTPStatus.OK
+
+    response = await client.delete(f"/favorites/{favorited_training.id}")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+async def get_favorite_count(client: AsyncClient, training_id: int) -> int:
+    response = await client.get(f"/trainings/{training_id}")
+    assert response.status_code == HTTPStatus.OK
+    count: int = response.json()["favorite_count"]
+    return count
+
+
+async def test_favorite_count(
+    favorited_training: Training, client: AsyncClient
+) -> None:
+    # it's cached after this
+    assert await get_favorite_count(client, favorited_training.id) == 1
+
+    # favoriting again doesn't count
+    json = {"training_id": favorited_training.id}
+    response = await client.post("/favorites", json=json)
+    assert response.status_code == HTTPStatus.CREATED
+    assert await get_favorite_count(client, favorited_training.id) == 1
+
+    as_user(2)
+    response = await client.post("/favorites", json=json)
+    assert response.status_code == HTTPStatus.CREATED
+    assert await get_favorite_count(client, favorited_training.id) == 2
+
+    response = await client.delete(f"/favorites/{favorited_training.id}")
+    assert response.status_code == HTTPStatus.OK
+    assert await get_favorite_count(client, favorited_training.id) == 1
+
+
+async def test_popular_trainings(client: AsyncClient) -> None:
+    old, recent, unfavorited = await create_trainings(client, 3)
+
+    for user in range(1, 4):
+        await post_as(client, user, "/favorites", {"training_id": old.id})
+    await post_as(client, 1, "/favorites", {"training_id": recent.id})
+    popular = "/trainings/popular"
+
+    # make the first training's favorites old
+    async with SessionLocal() as session:
+        await session.execute(
+            update(DBFavorite)
+            .where(DBFavorite.training_id == old.id)
+            .values(created_at=datetime.utcnow() - timedelta(days=30))
+        )
+        await session.commit()
+
+    both = [old.id, recent.id]
+    assert await get_training_ids(client, popular) == both
+    assert await get_training_ids(client, popular, limit=1) == [old.id]
+    assert await get_training_ids(client, popular, days=7) == [recent.id]
+    assert await get_training_ids(client, popular, days=60) == both
+
+    response = await client.get("/trainings/popular", params={"days": 0})
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
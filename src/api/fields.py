@@ -0,0 +1,41 @@
+from http import HTTPStatus
+from typing import Any, Dict, FrozenSet, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.api.model.training import Training
+
+
+FIELD_NAMES: Dict[str, str] = {
+    **{name: name for name in Training.__fields__},
+    **{field.alias: name for name, field in Training.__fields__.items()},
+}
+"""Training field names, by their name or alias"""
+
+
+def parse_fields(fields: Optional[str]) -> Optional[FrozenSet[str]]:
+    """Returns the training fields requested in the `fields` query
+    parameter, or None if all of them should be returned"""
+    if fields is None:
+        return None
+
+    names = {"id"}  # needed to tell the trainings apart, and paginate
+
+    for field in filter(None, map(str.strip, fields.split(","))):
+        if field not in FIELD_NAMES:
+            raise HTTPException(
+                HTTPStatus.BAD_REQUEST, f"Unknown training field: {field}"
+            )
+        names.add(FIELD_NAMES[field])
+
+    return frozenset(names)
+
+
+def sparse_response(content: Any) -> JSONResponse:
+    """Serializes trainings built with only some of their fields, leaving
+    the rest out of the response"""
+    return JSONResponse(
+        jsonable_encoder(content, by_alias=True, exclude_unset=True)
+    )
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Literal, Optional, Union
+from typing import List, Literal, NamedTuple, Optional, Union
 from fastapi import Query
 from pydantic import BaseModel, ConstrainedStr, Field
 from src.api.model.utils import OrmModel, make_all_required
@@ -10,6 +10,19 @@ from src.common.model import TrainingType
 MIN_DIFFICULTY = 0
 MAX_DIFFICULTY = 10
 
+MAX_PAGE_LIMIT = 500
+"""Largest page the listings return. Use the export for bigger reads"""
+
+MAX_TRAINING_BATCH = 100
+"""Most trainings that can be created in a single batch"""
+
+MAX_SEARCH_LENGTH = 100
+
+MAX_TOP_LIMIT = 100
+"""Most trainings returned by the ranking and the most favorited"""
+
+MAX_POPULAR_DAYS = 365
+
 
 # https://github.com/pydantic/pydantic/issues/156
 class Multimedia(ConstrainedStr):
@@ -114,6 +127,26 @@ class Training(AllRequiredTrainingBase):
         title="Amount of scores",
         description="The amount of times this training was scored by users",
     )
+    favorite_count: int = Field(
+        title="Amount of favorites",
+        description="The amount of users that favorited this training",
+    )
+
+
+class BatchItemResult(OrmModel):
+    status: int = Field(
+        title="Status",
+        description="HTTP status of the item: 201 if the training was "
+        "created, 409 if its title is already taken",
+    )
+    training: Optional[Training] = Field(
+        title="Training", description="The created training", default=None
+    )
+    detail: Optional[str] = Field(
+        title="Detail",
+        description="Why the training wasn't created",
+        default=None,
+    )
 
 
 class BlockStatus(BaseModel):
@@ -132,12 +165,33 @@ class ScoreBody(BaseModel):
     )
 
 
-class FilterParams(BaseModel):
-    offset: int = Field(Query(0, title="Query initial offset"))
-    limit: int = Field(Query(100, title="Query item limit"))
-    author: Optional[Union[Literal["me"], int]] = Field(
-        Query(None, title="Author filter")
+class OffsetParams(BaseModel):
+    offset: int = Field(Query(0, title="Query initial offset", ge=0))
+    limit: int = Field(
+        Query(100, title="Query item limit", ge=1, le=MAX_PAGE_LIMIT)
+    )
+    fields: Optional[str] = Field(
+        Query(
+            None,
+            title="Fields",
+            description="Comma separated training fields to include in the "
+            "response, e.g. `title,type,score`. All of them by default",
+        )
+    )
+
+
+class PageParams(OffsetParams):
+    cursor: Optional[str] = Field(
+        Query(
+            None,
+            title="Pagination cursor",
+            description="Opaque cursor returned in the previous page's "
+            "X-Next-Cursor header. Faster than offset for deep pages",
+        )
     )
+
+
+class TypeFilterParams(BaseModel):
     type: Union[TrainingType, Literal["all"]] = Field(
         title="Type filter",
         default="all",
@@ -150,10 +204,100 @@ class FilterParams(BaseModel):
             MAX_DIFFICULTY + 1, title="Maximum training difficulty (exclusive)"
         )
     )
+
+
+class TrainingFilterParams(TypeFilterParams):
+    author: Optional[Union[Literal["me"], int]] = Field(
+        Query(None, title="Author filter")
+    )
     blocked: Union[bool, Literal["all"]] = Field(
         Query(False, title="Return blocked trainings")
     )
 
+    def normalized(self, user: int) -> "ListingFilters":
+        """Resolves the filters' special values for the given user"""
+        return ListingFilters(
+            mindiff=max(self.mindiff, MIN_DIFFICULTY),
+            maxdiff=min(self.maxdiff, MAX_DIFFICULTY + 1),
+            blocked=self.blocked if self.blocked != "all" else None,
+            user=user if self.author == "me" else self.author,
+            type=self.type if self.type != "all" else None,
+        )
+
+
+class FilterParams(PageParams, TrainingFilterParams):
+    pass
+
+
+class SearchParams(OffsetParams, TrainingFilterParams):
+    q: str = Field(
+        Query(
+            title="Search query",
+            description="Words to look for in the trainings' title, "
+            "description and goal names",
+            min_length=1,
+            max_length=MAX_SEARCH_LENGTH,
+        )
+    )
+
+
+class TopParams(TypeFilterParams):
+    limit: int = Field(
+        Query(10, title="Amount of trainings", ge=1, le=MAX_TOP_LIMIT)
+    )
+
+    def normalized(self) -> "RankingFilters":
+        return RankingFilters(
+            mindiff=max(self.mindiff, MIN_DIFFICULTY),
+            maxdiff=min(self.maxdiff, MAX_DIFFICULTY + 1),
+            type=self.type if self.type != "all" else None,
+        )
+
+
+class PopularParams(BaseModel):
+    limit: int = Field(
+        Query(10, title="Amount of trainings", ge=1, le=MAX_TOP_LIMIT)
+    )
+    days: Optional[int] = Field(
+        Query(
+            None,
+            title="Time window",
+            description="Only count favorites added in the last `days` "
+            "days. All of them by default",
+            ge=1,
+            le=MAX_POPULAR_DAYS,
+        )
+    )
+
+
+class ListingFilters(NamedTuple):
+    """Filters as expected by the database functions.
+    Equivalent filters are equal, so they can be used as cache keys"""
+
+    mindiff: int
+    maxdiff: int
+    blocked: Optional[bool]
+    user: Optional[int]
+    type: Optional[TrainingType]
+
+
+class RankingFilters(NamedTuple):
+    """Like `ListingFilters`, for the ranking"""
+
+    mindiff: int
+    maxdiff: int
+    type: Optional[TrainingType]
+
 
 class TrainingCount(OrmModel):
     count: int = Field(title="Count", description="The number of trainings")
+
+
+class TrainingPage(OrmModel):
+    items: List[Training] = Field(
+        title="Items", description="The requested page of trainings"
+    )
+    total: int = Field(
+        title="Total",
+        description="The number of trainings matching the filters",
+    )
@@ -0,0 +1,43 @@
+import base64
+import binascii
+import json
+from http import HTTPStatus
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, Response
+
+from src.api.model.training import Training
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    """Builds an opaque cursor pointing after the given training ID"""
+    payload = json.dumps({"id": last_id}).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Returns the training ID the cursor points after"""
+    if cursor is None:
+        return None
+
+    try:
+        last_id = json.loads(base64.urlsafe_b64decode(cursor))["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        last_id = None
+
+    if not isinstance(last_id, int):
+        raise HTTPException(HTTPStatus.BAD_REQUEST, "Invalid cursor")
+
+    return last_id
+
+
+def set_next_cursor(
+    response: Response, page: Sequence[Training], limit: int
+) -> None:
+    """Adds the next page's cursor to the response, if there may be one"""
+    if len(page) > 0 and len(page) == limit:
+        cursor = encode_cursor(page[-1].id)
+        response.headers[NEXT_CURSOR_HEADER] = cursor
@@ -2,6 +2,7 @@ from http import HTTPStatus
 from fastapi import APIRouter
 
 from src.api.aliases import SessionDep, UserDep
+from src.api.cache import invalidate_training
 from src.api.model.training import ScoreBody
 from src.logging import info
 import src.db.trainings as trainings_db
@@ -27,5 +28,6 @@ async def post_score(
 ) -> ScoreBody:
     """Create or update a score"""
     res = await trainings_db.add_score(session, id, user.sub, score)
+    invalidate_training(id)
     info(f"New score: {res.score}, for training: {id}")
     return res
@@ -1,11 +1,21 @@
+import asyncio
 from httpx import AsyncClient
 from http import HTTPStatus
+from sqlalchemy import func, select
 
 
 from src.api.model.training import (
     Training,
 )
-from src.test_utils import assert_score_is
+from src.db.model.training import SCORE_SCALE, DBScore
+from src.db.session import SessionLocal
+from src.test_utils import (
+    as_user,
+    assert_score_is,
+    create_trainings,
+    get_training_ids,
+    post_as,
+)
 
 
 async def test_post_score(
@@ -28,3 +38,82 @@ async def test_edit_score(
     assert response.json() == {"score": new_score}
 
     await assert_score_is(client, new_score, 1, scored_training.id)
+
+
+async def test_score_average(
+    scored_training: Training, client: AsyncClient
+) -> None:
+    as_user(2)
+
+    new_score = 4.5
+    response = await client.post(
+        f"/trainings/{scored_training.id}/scores",
+        json={"score": new_score},
+    )
+    assert response.status_code == HTTPStatus.CREATED
+
+    average = (scored_training.score + new_score) / 2
+    await assert_score_is(client, average, 2, scored_training.id)
+
+    response = await client.get("/trainings")
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()[0]["score"] == average
+    assert response.json()[0]["score_amount"] == 2
+
+
+async def test_concurrent_scores(
+    created_body: Training, client: AsyncClient
+) -> None:
+    scores = [float(i % 5 + 1) for i in range(10)]
+    responses = await asyncio.gather(
+        *(
+            client.post(
+                f"/trainings/{created_body.id}/scores", json={"score": s}
+            )
+            for s in scores
+        )
+    )
+    assert all(r.status_code == HTTPStatus.CREATED for r in responses)
+
+    async with SessionLocal() as session:
+        rows = await session.scalar(
+            select(func.count()).where(DBScore.training_id == created_body.id)
+        )
+        last_score = await session.scalar(
+            select(DBScore.score).filter_by(training_id=created_body.id)
+        )
+
+    assert rows == 1
+    assert last_score is not None
+    await assert_score_is(client, last_score / SCORE_SCALE, 1, created_body.id)
+
+
+async def test_top_trainings(client: AsyncClient) -> None:
+    # difficulties 0, 1 and 2
+    one_perfect, many_good, unscored = await create_trainings(client, 3)
+    perfect_scores = f"/trainings/{one_perfect.id}/scores"
+    good_scores = f"/trainings/{many_good.id}/scores"
+    top = "/trainings/top"
+
+    await post_as(client, 1, perfect_scores, {"score": 5.0})
+    for user in range(1, 11):
+        await post_as(client, user, good_scores, {"score": 4.8})
+
+    # many good scores outrank a single perfect one
+    ranking = [many_good.id, one_perfect.id]
+    assert await get_training_ids(client, top) == ranking
+    assert await get_training_ids(client, top, limit=1) == [many_good.id]
+    assert await get_training_ids(client, top, maxdiff=1) == [one_perfect.id]
+    assert await get_training_ids(client, top, type="walk") == []
+
+    # edited scores move the training down
+    for user in range(1, 11):
+        await post_as(client, user, good_scores, {"score": 1.0})
+    ranking = [one_perfect.id, many_good.id]
+    assert await get_training_ids(client, top) == ranking
+
+    response = await client.patch(
+        f"/trainings/{one_perfect.id}/status", json={"blocked": True}
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert await get_training_ids(client, top) == [many_good.id]
@@ -0,0 +1,27 @@
+from typing import Dict
+
+from fastapi import APIRouter, Depends
+
+from src.auth import get_admin
+from src.cache import CacheStats, get_cache_stats
+from src.db.pool import PoolStats, get_pool_stats
+from src.db.session import engine
+
+
+router = APIRouter(
+    prefix="/stats",
+    tags=["Stats"],
+    dependencies=[Depends(get_admin)],
+)
+
+
+@router.get("/caches")
+async def get_caches_stats() -> Dict[str, CacheStats]:
+    """Get the counters of this instance's in-process caches"""
+    return get_cache_stats()
+
+
+@router.get("/pool")
+async def get_db_pool_stats() -> PoolStats:
+    """Get the counters of this instance's database connection pool"""
+    return get_pool_stats(engine.pool)
@@ -0,0 +1,16 @@
+from http import HTTPStatus
+from httpx import AsyncClient
+
+from src.db.pool import PoolStats
+
+
+async def test_pool_stats(client: AsyncClient) -> None:
+    response = await client.get("/trainings")
+    assert response.status_code == HTTPStatus.OK
+
+    response = await client.get("/stats/pool")
+    assert response.status_code == HTTPStatus.OK
+
+    stats = PoolStats(**response.json())
+    assert stats.checkouts > 0
+    assert stats.checked_out == 0
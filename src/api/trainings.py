@@ -1,23 +1,54 @@
+from datetime import datetime, timedelta
 from http import HTTPStatus
-from typing import Callable, List, Annotated
+from typing import AsyncIterator, Callable, List, Annotated, Union
 
-from fastapi import APIRouter, Depends
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
 
 
 from src.api.model.training import (
+    MAX_TRAINING_BATCH,
+    BatchItemResult,
     BlockStatus,
     CreateTraining,
     FilterParams,
     PatchTraining,
+    PopularParams,
+    SearchParams,
+    TopParams,
     Training,
     TrainingCount,
+    TrainingFilterParams,
+    TrainingPage,
 )
 from src.api.aliases import SessionDep, UserDep
+from src.api.cache import (
+    invalidate_catalogue,
+    invalidate_training,
+    listing_cache,
+    listing_key,
+    serialize_training,
+    training_cache,
+)
+from src.api.etag import ETAG_HEADER, is_fresh, make_etag, not_modified
+from src.api.fields import parse_fields, sparse_response
+from src.api.pagination import decode_cursor, set_next_cursor
 from src.auth import get_admin, get_user
+from src.db.config import EXPORT_CHUNK_SIZE
 from src.db.utils import get_session
 from src.logging import info
+import src.db.favorites as favorites_db
 import src.db.trainings as trainings_db
 from src.metrics.reports import get_training_creation_reporter
+from src.related import RELATED, RELATED_TOP_K
 
 
 router = APIRouter(
@@ -29,31 +60,62 @@ router = APIRouter(
 )
 
 Filters = Annotated[FilterParams, Depends()]
+ExportFilters = Annotated[TrainingFilterParams, Depends()]
+Search = Annotated[SearchParams, Depends()]
+Top = Annotated[TopParams, Depends()]
+Popular = Annotated[PopularParams, Depends()]
 CreationReporterDep = Annotated[
     Callable[[Training], None], Depends(get_training_creation_reporter)
 ]
 
 
-@router.get("")
+@router.get("", response_model=Union[List[Training], TrainingPage])
 async def get_all_trainings(
     session: SessionDep,
     user: UserDep,
     f: Filters,
-) -> List[Training]:
+    response: Response,
+    with_total: bool = Query(
+        False,
+        title="Include total",
+        description="Wrap the trainings in an envelope together with the "
+        "number of trainings matching the filters",
+    ),
+) -> Union[List[Training], TrainingPage, Response]:
     """Get all trainings"""
-    sub = user.sub if f.author == "me" else f.author
-    blk = f.blocked if f.blocked != "all" else None
-    type = f.type if f.type != "all" else None
-    return await trainings_db.get_all_trainings(
-        session,
-        f.offset,
-        f.limit,
-        f.mindiff,
-        f.maxdiff,
-        blk,
-        user=sub,
-        type=type,
+    filters = f.normalized(user.sub)
+    after = decode_cursor(f.cursor)
+    fields = parse_fields(f.fields)
+    key = listing_key(
+        "trainings", with_total, f.offset, f.limit, after, fields, filters
     )
+    result = listing_cache.get(key)
+
+    if result is None:
+        get_trainings = (
+            trainings_db.get_trainings_page
+            if with_total
+            else trainings_db.get_all_trainings
+        )
+        result = await get_trainings(
+            session,
+            f.offset,
+            f.limit,
+            **filters._asdict(),
+            after=after,
+            fields=fields,
+        )
+        listing_cache.set(key, result)
+
+    trainings = result.items if isinstance(result, TrainingPage) else result
+    if fields is not None:
+        # a returned response doesn't get the injected response's headers
+        response = sparse_response(result)
+        set_next_cursor(response, trainings, f.limit)
+        return response
+
+    set_next_cursor(response, trainings, f.limit)
+    return result
 
 
 @router.get("/count")
@@ -63,18 +125,158 @@ async def get_training_count(
     f: Filters,
 ) -> TrainingCount:
     """Get the number of trainings"""
-    sub = user.sub if f.author == "me" else f.author
-    blk = f.blocked if f.blocked != "all" else None
-    type = f.type if f.type != "all" else None
-    return await trainings_db.count_trainings(
-        session, f.mindiff, f.maxdiff, blk, user=sub, type=type
+    filters = f.normalized(user.sub)
+    key = listing_key("count", filters)
+    count = listing_cache.get(key)
+
+    if count is None:
+        count = await trainings_db.count_trainings(
+            session, **filters._asdict()
+        )
+        listing_cache.set(key, count)
+
+    return count
+
+
+@router.get("/search", response_model=List[Training])
+async def search_trainings(
+    session: SessionDep, user: UserDep, s: Search
+) -> Union[List[Training], Response]:
+    """Search trainings by title, description and goal names, best
+    matches first"""
+    filters = s.normalized(user.sub)
+    fields = parse_fields(s.fields)
+    key = listing_key("search", s.q, s.offset, s.limit, fields, filters)
+    result = listing_cache.get(key)
+
+    if result is None:
+        result = await trainings_db.search_trainings(
+            session,
+            s.q,
+            s.offset,
+            s.limit,
+            **filters._asdict(),
+            fields=fields,
+        )
+        listing_cache.set(key, result)
+
+    if fields is not None:
+        return sparse_response(result)
+
+    return result
+
+
+@router.get("/top")
+async def get_top_trainings(session: SessionDep, t: Top) -> List[Training]:
+    """Get the best rated trainings. Scores are weighted by their amount,
+    so a few high scores don't outrank many good ones"""
+    filters = t.normalized()
+    key = listing_key("top", t.limit, filters)
+    result = listing_cache.get(key)
+
+    if result is None:
+        result = await trainings_db.get_top_trainings(
+            session, t.limit, **filters._asdict()
+        )
+        listing_cache.set(key, result)
+
+    return result
+
+
+@router.get("/popular")
+async def get_popular_trainings(
+    session: SessionDep, p: Popular
+) -> List[Training]:
+    """Get the most favorited trainings, optionally counting only the
+    favorites of the last days"""
+    key = listing_key("popular", p.limit, p.days)
+    result = listing_cache.get(key)
+
+    if result is None:
+        since = None
+        if p.days is not None:
+            since = datetime.utcnow() - timedelta(days=p.days)
+
+        result = await favorites_db.get_popular_trainings(
+            session, p.limit, since
+        )
+        listing_cache.set(key, result)
+
+    return result
+
+
+@router.get("/export", dependencies=[Depends(get_admin)])
+async def export_trainings(
+    session: SessionDep, user: UserDep, f: ExportFilters
+) -> StreamingResponse:
+    """Stream all the trainings matching the filters, as newline
+    delimited JSON ordered by ID"""
+    filters = f.normalized(user.sub)
+    chunks = trainings_db.stream_trainings(
+        session, **filters._asdict(), chunk_size=EXPORT_CHUNK_SIZE
     )
 
+    async def ndjson() -> AsyncIterator[bytes]:
+        async for chunk in chunks:
+            yield b"".join(serialize_training(t) + b"\n" for t in chunk)
 
-@router.get("/{id}")
-async def get_training(session: SessionDep, id: int) -> Training:
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.get("/{id}", response_model=Training)
+async def get_training(
+    session: SessionDep, request: Request, id: int
+) -> Response:
     """Get the training with the specified id"""
-    return await trainings_db.get_training_by_id(session, id)
+    cached = training_cache.get(id)
+
+    if cached is None:
+        if "If-None-Match" in request.headers:
+            # check the client's copy before loading the whole training
+            version = await trainings_db.get_training_version(session, id)
+            etag = make_etag(id, version)
+
+            if is_fresh(request, etag):
+                return not_modified(etag)
+
+        training, version = await trainings_db.get_training_by_id(session, id)
+        cached = (make_etag(id, version), serialize_training(training))
+        training_cache.set(id, cached)
+
+    etag, payload = cached
+
+    if is_fresh(request, etag):
+        return not_modified(etag)
+
+    return Response(
+        payload, media_type="application/json", headers={ETAG_HEADER: etag}
+    )
+
+
+@router.get("/{id}/related")
+async def get_related_trainings(
+    session: SessionDep,
+    id: int,
+    limit: int = Query(
+        10, title="Amount of trainings", ge=1, le=RELATED_TOP_K
+    ),
+) -> List[Training]:
+    """Get the trainings most often favorited by the users who favorited
+    this one"""
+    if not RELATED.ready.is_set():
+        raise HTTPException(
+            HTTPStatus.SERVICE_UNAVAILABLE,
+            "Related trainings are still being built",
+        )
+
+    ids = RELATED.related(id, limit)
+
+    if len(ids) == 0:
+        # tell missing trainings from the ones without related trainings
+        await trainings_db.get_training_version(session, id)
+        return []
+
+    return await trainings_db.get_trainings_by_ids(session, ids)
 
 
 @router.post("", status_code=HTTPStatus.CREATED)
@@ -88,11 +290,37 @@ async def post_training(
     new_training = await trainings_db.create_training(
         session, user.sub, training
     )
+    invalidate_catalogue()
     info(f"New training created: {new_training}")
     report_created(new_training)
     return new_training
 
 
+@router.post("/batch", status_code=HTTPStatus.MULTI_STATUS)
+async def post_trainings(
+    session: SessionDep,
+    user: UserDep,
+    report_created: CreationReporterDep,
+    trainings: Annotated[
+        List[CreateTraining],
+        Body(min_items=1, max_items=MAX_TRAINING_BATCH),
+    ],
+) -> List[BatchItemResult]:
+    """Create many trainings at once. Each one is created unless its
+    title is taken, and gets its own result"""
+    results = await trainings_db.create_trainings(session, user.sub, trainings)
+    created = [r.training for r in results if r.training is not None]
+
+    if len(created) > 0:
+        invalidate_catalogue()
+
+    info(f"{len(created)} of {len(trainings)} trainings created in batch")
+    for training in created:
+        report_created(training)
+
+    return results
+
+
 @router.patch("/{id}")
 async def patch_training(
     session: SessionDep,
@@ -104,6 +332,7 @@ async def patch_training(
     edited_training = await trainings_db.patch_training(
         session, user.sub, id, training_patch
     )
+    invalidate_training(id)
     info(f"Training edited: {edited_training}")
     return edited_training
 
@@ -118,6 +347,7 @@ async def block_training(
     edited_training = await trainings_db.change_block_status(
         session, id, block_status.blocked
     )
+    invalidate_training(id)
     status = "blocked" if edited_training.blocked else "unblocked"
     info(
         f"Training block status changed. ID: {edited_training.id}"
@@ -1,14 +1,31 @@
-from typing import Any, Dict
+from typing import Any, Dict, List
+import pytest
 from httpx import AsyncClient
 from http import HTTPStatus
 
 
 from src.common.model import TrainingType
 from src.api.model.training import (
+    MAX_PAGE_LIMIT,
+    MAX_TRAINING_BATCH,
+    BatchItemResult,
     BlockStatus,
     CreateTraining,
     PatchTraining,
     Training,
+    TrainingPage,
+)
+from src.api.etag import ETAG_HEADER
+from src.api.pagination import NEXT_CURSOR_HEADER
+from src.auth import get_admin
+from src.cache import clear_caches
+from src.main import app
+from src.test_utils import (
+    as_user,
+    count_statements,
+    create_trainings,
+    request_statements,
+    training_body,
 )
 
 
@@ -204,3 +221,395 @@ async def test_trainings_invalid_body(
         {**body.dict(), "goals": [{"name": "name", "description": "a" * 301}]},
         client,
     )
+
+
+async def test_trainings_get_constant_statements(client: AsyncClient) -> None:
+    await create_trainings(client, 10)
+
+    with count_statements() as small_page:
+        response = await client.get("/trainings", params={"limit": 1})
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json()) == 1
+
+    with count_statements() as big_page:
+        response = await client.get("/trainings", params={"limit": 10})
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json()) == 10
+
+    # trainings + one batched query per child collection
+    assert len(small_page) == len(big_page) == 3
+
+
+async def test_trainings_get_with_total_statements(
+    client: AsyncClient,
+) -> None:
+    await create_trainings(client, 10)
+
+    params: Dict[str, Any] = {"limit": 5, "with_total": True}
+    response = await client.get("/trainings", params=params)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["total"] == 10
+
+    # the total is counted by the page's query
+    assert request_statements(response) == 3
+
+
+async def test_trainings_sparse_fields(client: AsyncClient) -> None:
+    trainings = await create_trainings(client, 3)
+    params: Dict[str, Any] = {
+        "fields": "title,type,difficulty,score",
+        "limit": 2,
+    }
+
+    with count_statements() as statements:
+        response = await client.get("/trainings", params=params)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == [
+        {
+            "id": t.id,
+            "title": t.title,
+            "type": t.type,
+            "difficulty": t.difficulty,
+            "score": t.score,
+        }
+        for t in trainings[:2]
+    ]
+
+    # no child collections are loaded, nor unrequested columns
+    assert len(statements) == 1
+    assert "description" not in statements[0][0]
+
+    params["cursor"] = response.headers[NEXT_CURSOR_HEADER]
+    response = await client.get("/trainings", params=params)
+    assert response.status_code == HTTPStatus.OK
+    assert [t["id"] for t in response.json()] == [trainings[2].id]
+
+    params = {"fields": "goals,createdAt", "with_total": True}
+    response = await client.get("/trainings", params=params)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["total"] == 3
+    assert response.json()["items"][0] == {
+        "id": trainings[0].id,
+        "goals": [g.dict() for g in trainings[0].goals or []],
+        "createdAt": trainings[0].created_at.isoformat(),
+    }
+
+    response = await client.get("/trainings", params={"fields": "invalid"})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+async def test_trainings_cursor_pagination(client: AsyncClient) -> None:
+    trainings = await create_trainings(client, 10)
+
+    got: List[Training] = []
+    params: Dict[str, Any] = {"limit": 3}
+    while True:
+        response = await client.get("/trainings", params=params)
+        assert response.status_code == HTTPStatus.OK
+        got.extend(Training(**t) for t in response.json())
+
+        if NEXT_CURSOR_HEADER not in response.headers:
+            break
+        params["cursor"] = response.headers[NEXT_CURSOR_HEADER]
+
+    assert got == trainings
+
+    # offset mode is still available
+    response = await client.get("/trainings", params={"offset": 3})
+    assert response.status_code == HTTPStatus.OK
+    assert [Training(**t) for t in response.json()] == trainings[3:]
+
+
+async def test_trainings_invalid_cursor(client: AsyncClient) -> None:
+    for cursor in ["invalid", "bm90IGpzb24=", "eyJpZCI6ICJhIn0="]:
+        response = await client.get("/trainings", params={"cursor": cursor})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+async def test_trainings_with_total(client: AsyncClient) -> None:
+    trainings = await create_trainings(client, 10)
+
+    params: Dict[str, Any] = {"limit": 3, "with_total": True}
+    with count_statements() as statements:
+        response = await client.get("/trainings", params=params)
+    assert response.status_code == HTTPStatus.OK
+
+    page = TrainingPage(**response.json())
+    assert page.items == trainings[:3]
+    assert page.total == 10
+
+    # the total is fetched along with the page
+    assert len(statements) == 3
+
+    params["mindiff"] = 5
+    response = await client.get("/trainings", params=params)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["total"] == 5
+
+    response = await client.get("/trainings/count", params=params)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {"count": 5}
+
+    # past the last page
+    params["offset"] = 10
+    response = await client.get("/trainings", params=params)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {"items": [], "total": 5}
+
+
+async def test_trainings_get_cached(
+    created_body: Training, client: AsyncClient
+) -> None:
+    url = f"/trainings/{created_body.id}"
+    response = await client.get(url)
+    assert response.status_code == HTTPStatus.OK
+
+    with count_statements() as statements:
+        response = await client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert Training(**response.json()) == created_body
+    assert len(statements) == 0
+
+    response = await client.get("/stats/caches")
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["trainings"]["hits"] == 1
+
+    # edits invalidate the cached training
+    body = PatchTraining(description="new description")
+    response = await client.patch(url, json=body.dict())
+    assert response.status_code == HTTPStatus.OK
+
+    response = await client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["description"] == "new description"
+
+    response = await client.patch(
+        f"{url}/status", json=BlockStatus(blocked=True).dict()
+    )
+    assert response.status_code == HTTPStatus.OK
+
+    response = await client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["blocked"]
+
+    response = await client.post(f"{url}/scores", json={"score": 4})
+    assert response.status_code == HTTPStatus.CREATED
+
+    response = await client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["score"] == 4
+
+
+async def test_trainings_listing_cached(
+    created_body: Training, client: AsyncClient
+) -> None:
+    for url in ["/trainings", "/trainings/count"]:
+        response = await client.get(url, params={"author": "me"})
+        assert response.status_code == HTTPStatus.OK
+
+        with count_statements() as statements:
+            cached = await client.get(url, params={"author": "me"})
+        assert cached.status_code == HTTPStatus.OK
+        assert cached.json() == response.json()
+        assert len(statements) == 0
+
+    # "me" is resolved per user
+    as_user(2)
+
+    response = await client.get("/trainings", params={"author": "me"})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == []
+
+    # creating a training invalidates the listings
+    await create_trainings(client, 1)
+
+    response = await client.get("/trainings", params={"author": "me"})
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json()) == 1
+
+    response = await client.get("/trainings/count")
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {"count": 2}
+
+
+async def test_trainings_export(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr("src.api.trainings.EXPORT_CHUNK_SIZE", 2)
+    trainings = await create_trainings(client, 5)
+
+    with count_statements() as statements:
+        response = await client.get("/trainings/export")
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    lines = response.text.splitlines()
+    assert [Training.parse_raw(line) for line in lines] == trainings
+
+    # trainings, and the child collections of each chunk of 2 trainings
+    assert len(statements) == 1 + 2 * 3
+
+    response = await client.get("/trainings/export", params={"mindiff": 3})
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.text.splitlines()) == 2
+
+
+async def test_trainings_export_requires_admin(client: AsyncClient) -> None:
+    as_user(2)
+    del app.dependency_overrides[get_admin]
+
+    response = await client.get("/trainings/export")
+    assert response.status_code == HTTPStatus.FORBIDDEN
+
+
+async def test_trainings_limit_is_capped(client: AsyncClient) -> None:
+    for params in [
+        {"limit": MAX_PAGE_LIMIT + 1},
+        {"limit": -1},
+        {"limit": 0},
+        {"offset": -1},
+    ]:
+        response = await client.get("/trainings", params=params)
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+        response = await client.get("/favorites", params=params)
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+async def test_trainings_batch(client: AsyncClient) -> None:
+    [existing] = await create_trainings(client, 1)
+    bodies = [training_body(i).dict() for i in range(5)]
+    bodies.append(training_body(1).dict())
+
+    with count_statements() as statements:
+        response = await client.post("/trainings/batch", json=bodies)
+    assert response.status_code == HTTPStatus.MULTI_STATUS
+
+    results = [BatchItemResult(**r) for r in response.json()]
+    statuses = [r.status for r in results]
+    assert statuses == [409, 201, 201, 201, 201, 409]
+    assert results[0].detail is not None
+
+    # titles check, then one INSERT per table and the search index
+    assert len(statements) == 5
+
+    response = await client.get("/trainings")
+    assert response.status_code == HTTPStatus.OK
+    created = [r.training for r in results if r.training is not None]
+    assert [Training(**t) for t in response.json()] == [existing, *created]
+
+
+async def test_trainings_batch_too_big(client: AsyncClient) -> None:
+    bodies = [training_body(i).dict() for i in range(MAX_TRAINING_BATCH + 1)]
+    response = await client.post("/trainings/batch", json=bodies)
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+async def test_trainings_get_etag(
+    created_body: Training, client: AsyncClient
+) -> None:
+    url = f"/trainings/{created_body.id}"
+    response = await client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    etag = response.headers[ETAG_HEADER]
+
+    headers = {"If-None-Match": etag}
+    with count_statements() as statements:
+        response = await client.get(url, headers=headers)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers[ETAG_HEADER] == etag
+    assert response.content == b""
+    assert len(statements) == 0
+
+    # without the cached training, only its version is read
+    clear_caches()
+    with count_statements() as statements:
+        response = await client.get(url, headers=headers)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert len(statements) == 1
+    assert "training_goals" not in statements[0][0]
+
+    changes = [
+        client.patch(url, json={"description": "new description"}),
+        client.patch(f"{url}/status", json={"blocked": True}),
+        client.post(f"{url}/scores", json={"score": 3}),
+    ]
+    for change in changes:
+        response = await change
+        assert response.status_code in (HTTPStatus.OK, HTTPStatus.CREATED)
+
+        response = await client.get(url, headers=headers)
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers[ETAG_HEADER] != etag
+        etag = response.headers[ETAG_HEADER]
+        headers = {"If-None-Match": etag}
+
+
+async def search(client: AsyncClient, **params: Any) -> List[Training]:
+    response = await client.get("/trainings/search", params=params)
+    assert response.status_code == HTTPStatus.OK
+    return [Training(**t) for t in response.json()]
+
+
+async def test_trainings_search(client: AsyncClient) -> None:
+    bodies = [
+        CreateTraining(
+            **{**training_body(0).dict(), "title": "Morning run"},
+        ),
+        CreateTraining(
+            **{
+                **training_body(1).dict(),
+                "title": "Stretching",
+                "description": "Stretch after a run",
+            },
+        ),
+        CreateTraining(
+            **{
+                **training_body(2).dict(),
+                "title": "Intervals",
+                "type": TrainingType.WALK,
+                "goals": [{"name": "Run faster", "description": ""}],
+            },
+        ),
+    ]
+    response = await client.post(
+        "/trainings/batch", json=[b.dict() for b in bodies]
+    )
+    assert response.status_code == HTTPStatus.MULTI_STATUS
+
+    # title matches rank above description and goal matches
+    found = await search(client, q="run")
+    assert [t.title for t in found] == [
+        "Morning run",
+        "Stretching",
+        "Intervals",
+    ]
+
+    found = await search(client, q="run", type="walk")
+    assert [t.title for t in found] == ["Intervals"]
+
+    found = await search(client, q="run", limit=1, offset=1)
+    assert [t.title for t in found] == ["Stretching"]
+
+    # all the words must match, and operators are ignored
+    assert await search(client, q="morning stretch") == []
+    assert await search(client, q='"run" OR NOT') == []
+    assert await search(client, q="***") == []
+
+    response = await client.get("/trainings/search", params={"q": ""})
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+async def test_trainings_search_after_patch(
+    created_body: Training, client: AsyncClient
+) -> None:
+    assert await search(client, q="title") == [created_body]
+
+    goals = [{"name": "Distancia", "description": ""}]
+    patch = {"title": "Caminata", "goals": goals}
+    response = await client.patch(f"/trainings/{created_body.id}", json=patch)
+    assert response.status_code == HTTPStatus.OK
+    edited = Training(**response.json())
+
+    assert await search(client, q="title") == []
+    assert await search(client, q="caminata distancia") == [edited]
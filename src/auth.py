@@ -1,16 +1,18 @@
 import os
+from hashlib import sha256
+from time import time
 from typing import Annotated, Optional
 from http import HTTPStatus
 from pydantic import BaseModel
-from starlette.middleware.base import (
-    BaseHTTPMiddleware,
-    RequestResponseEndpoint,
-)
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
 from jose import jwt
 from jose.exceptions import JWTError, ExpiredSignatureError, JWTClaimsError
 from fastapi.security import OAuth2PasswordBearer
-from fastapi import Depends, HTTPException, Request, Response
+from fastapi import Depends, HTTPException
+from fastapi.responses import JSONResponse
 
+from src.cache import LRUCache
 from src.logging import info
 
 _AUTH_SECRET = os.getenv("AUTH_SECRET")
@@ -21,14 +23,34 @@ oauth2_scheme = OAuth2PasswordBearer(
 )
 
 
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE") or 4096)
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL") or 300)
+
+
 class User(BaseModel):
     email: str
     sub: int
     admin: bool
 
+    class Config:
+        # cached users are shared between requests
+        allow_mutation = False
+
+
+token_cache: LRUCache[bytes, User] = LRUCache(
+    "tokens", TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL
+)
+"""Users from already validated tokens, by the token's hash"""
+
 
 async def get_user(token: Annotated[str, Depends(oauth2_scheme)]) -> User:
     """Validates token and extracts user information"""
+    key = sha256(token.encode()).digest()
+    user = token_cache.get(key)
+
+    if user is not None:
+        return user
+
     try:
         user_info = jwt.decode(
             token,
@@ -41,7 +63,13 @@ async def get_user(token: Annotated[str, Depends(oauth2_scheme)]) -> User:
             HTTPStatus.UNAUTHORIZED, "Token is invalid or has expired"
         )
 
-    return User(**user_info)
+    user = User(**user_info)
+    # never keep a token around after it expires
+    exp = user_info.get("exp")
+    ttl = None if exp is None else min(exp - time(), TOKEN_CACHE_TTL)
+    token_cache.set(key, user, ttl)
+
+    return user
 
 
 async def get_admin(user: Annotated[User, Depends(get_user)]) -> User:
@@ -63,6 +91,15 @@ async def ignore_auth() -> User:
 
 APIKEY = os.getenv("APIKEY")
 APIKEY_HEADER = "X-Apikey"
+APIKEY_EXEMPT_PATHS = {
+    "/health",
+    "/metrics",
+    "/docs",
+    "/openapi.json",
+    "/favicon.ico",
+}
+"""Paths that can be requested without an apikey: by probes, scrapers,
+and browsers loading the Swagger UI"""
 
 
 def req_apikey_is_valid(apikey: Optional[str]) -> bool:
@@ -73,8 +110,25 @@ def req_apikey_is_valid(apikey: Optional[str]) -> bool:
     return True
 
 
-class ApikeyMiddleware(BaseHTTPMiddleware):
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
-        return await call_next(request)
+class ApikeyMiddleware:
+    """Rejects requests without a valid apikey. Written as a plain ASGI
+    middleware, so it doesn't add a task or buffer the response"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["path"] in APIKEY_EXEMPT_PATHS
+            or req_apikey_is_valid(Headers(scope=scope).get(APIKEY_HEADER))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        response = JSONResponse(
+            {"detail": "Invalid apikey"}, HTTPStatus.UNAUTHORIZED
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,131 @@
+from http import HTTPStatus
+from time import perf_counter, time
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request, Response
+from httpx import AsyncClient
+from jose import jwt
+from starlette.middleware.base import (
+    BaseHTTPMiddleware,
+    RequestResponseEndpoint,
+)
+from starlette.types import ASGIApp
+
+import src.auth as auth
+from src.auth import (
+    APIKEY_HEADER,
+    AUTH_SECRET,
+    ApikeyMiddleware,
+    User,
+    get_user,
+    token_cache,
+)
+from src.test_utils import benchmark
+
+
+def make_token(exp: float, sub: int = 1) -> str:
+    claims = {"email": "user@example.com", "sub": sub, "admin": False}
+    return jwt.encode({**claims, "exp": int(exp)}, AUTH_SECRET, "HS256")
+
+
+async def test_token_is_cached() -> None:
+    token_cache.clear()
+    token = make_token(time() + 60)
+
+    user = await get_user(token)
+    assert user == User(email="user@example.com", sub=1, admin=False)
+    assert await get_user(token) is user
+
+    stats = token_cache.stats()
+    assert (stats.size, stats.hits, stats.misses) == (1, 1, 1)
+
+
+async def test_expired_token_is_not_cached() -> None:
+    token_cache.clear()
+
+    with pytest.raises(HTTPException) as e:
+        await get_user(make_token(time() - 60))
+
+    assert e.value.status_code == HTTPStatus.UNAUTHORIZED
+    assert token_cache.stats().size == 0
+
+
+@benchmark
+async def test_cached_token_overhead() -> None:
+    """Compares the time spent authenticating a request with and without
+    the token cache. Run with `pytest -s` to see the numbers."""
+    rounds = 1000
+    tokens = [make_token(time() + 60, sub=i) for i in range(rounds)]
+
+    token_cache.clear()
+    start = perf_counter()
+    for token in tokens:
+        await get_user(token)
+    uncached = (perf_counter() - start) / rounds
+
+    start = perf_counter()
+    for token in tokens:
+        await get_user(token)
+    cached = (perf_counter() - start) / rounds
+
+    print(
+        f"\nget_user: {uncached * 1e6:.1f}us uncached,"
+        f" {cached * 1e6:.1f}us cached"
+    )
+    assert cached < uncached
+
+
+async def test_apikey_is_enforced(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(auth, "APIKEY", "secret")
+
+    response = await client.get("/trainings")
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    response = await client.get("/trainings", headers={APIKEY_HEADER: "bad"})
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    headers = {APIKEY_HEADER: "secret"}
+    response = await client.get("/trainings", headers=headers)
+    assert response.status_code == HTTPStatus.OK
+
+    for path in ["/health", "/metrics", "/docs", "/openapi.json"]:
+        response = await client.get(path)
+        assert response.status_code == HTTPStatus.OK
+
+
+class PassthroughMiddleware(BaseHTTPMiddleware):
+    async def dispatch(
+        self, request: Request, call_next: RequestResponseEndpoint
+    ) -> Response:
+        return await call_next(request)
+
+
+async def time_requests(app: ASGIApp, rounds: int) -> float:
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        start = perf_counter()
+        for _ in range(rounds):
+            await client.get("/")
+        return (perf_counter() - start) / rounds
+
+
+@benchmark
+async def test_middleware_overhead() -> None:
+    """Compares the time spent on a request going through a pure ASGI
+    middleware and a `BaseHTTPMiddleware`. Run with `pytest -s` to see the
+    numbers."""
+    rounds = 500
+    app = FastAPI()
+    app.get("/")(lambda: None)
+
+    bare = await time_requests(app, rounds)
+    base = await time_requests(PassthroughMiddleware(app), rounds)
+    pure = await time_requests(ApikeyMiddleware(app), rounds)
+
+    print(
+        f"\nrequest: {bare * 1e6:.1f}us bare,"
+        f" {base * 1e6:.1f}us BaseHTTPMiddleware,"
+        f" {pure * 1e6:.1f}us ApikeyMiddleware"
+    )
+    assert pure < base
@@ -0,0 +1,108 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+from pydantic import BaseModel, Field
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+CACHES: Dict[str, "LRUCache[Any, Any]"] = {}
+"""All the caches in the service, by name"""
+
+
+class CacheStats(BaseModel):
+    size: int = Field(title="Size", description="Current amount of entries")
+    maxsize: int = Field(
+        title="Max size", description="Maximum amount of entries"
+    )
+    hits: int = Field(title="Hits", description="Lookups found in cache")
+    misses: int = Field(title="Misses", description="Lookups not in cache")
+    hit_rate: float = Field(
+        title="Hit rate", description="Fraction of lookups found in cache"
+    )
+    evictions: int = Field(
+        title="Evictions",
+        description="Entries dropped to make room for new ones",
+    )
+
+
+class LRUCache(Generic[K, V]):
+    """In-process cache with LRU eviction and per-entry expiration.
+
+    Memory is bounded by `maxsize` entries. Entries expire `ttl` seconds
+    after being set, unless another expiration is given. Unless told
+    otherwise, the cache is added to `CACHES`.
+    """
+
+    def __init__(
+        self, name: str, maxsize: int, ttl: float, register: bool = True
+    ) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[K, Tuple[float, V]] = OrderedDict()
+        if register:
+            CACHES[name] = self
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self._entries.get(key)
+
+        if entry is not None and entry[0] <= monotonic():
+            del self._entries[key]
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+
+        expires_at = monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: K) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drops all entries and resets the counters"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> CacheStats:
+        lookups = self.hits + self.misses
+        return CacheStats(
+            size=len(self._entries),
+            maxsize=self.maxsize,
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / lookups if lookups > 0 else 0.0,
+            evictions=self.evictions,
+        )
+
+
+def get_cache_stats() -> Dict[str, CacheStats]:
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+
+def clear_caches() -> None:
+    for cache in CACHES.values():
+        cache.clear()
@@ -0,0 +1,39 @@
+from src.cache import CACHES, LRUCache
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    cache: LRUCache[int, str] = LRUCache(
+        "test_lru", maxsize=2, ttl=60, register=False
+    )
+
+    cache.set(1, "one")
+    cache.set(2, "two")
+    assert cache.get(1) == "one"
+
+    cache.set(3, "three")
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "one"
+    assert cache.get(3) == "three"
+
+    stats = cache.stats()
+    assert (stats.size, stats.hits, stats.misses) == (2, 3, 1)
+    assert stats.hit_rate == 0.75
+    assert stats.evictions == 1
+
+
+def test_cache_expires_entries() -> None:
+    cache: LRUCache[int, str] = LRUCache(
+        "test_ttl", maxsize=2, ttl=60, register=False
+    )
+
+    cache.set(1, "one", ttl=0)
+    cache.set(2, "two")
+
+    assert cache.get(1) is None
+    assert cache.get(2) == "two"
+    assert cache.stats().size == 1
+
+    cache.invalidate(2)
+    assert cache.get(2) is None
+    assert "test_ttl" not in CACHES
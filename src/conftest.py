@@ -5,6 +5,8 @@ from typing import AsyncGenerator, Generator
 from http import HTTPStatus
 
 from src.auth import get_admin, get_user, ignore_auth
+from src.cache import clear_caches
+import src.telemetry as telemetry
 from src.db.migration import downgrade_db
 from src.main import app, lifespan
 from src.metrics.reports import get_training_creation_reporter
@@ -32,9 +34,15 @@ def event_loop() -> Generator[asyncio.AbstractEventLoop, None, None]:
 
 
 @pytest.fixture
-async def client() -> AsyncGenerator[AsyncClient, None]:
-    # reset database
+async def client(
+    monkeypatch: pytest.MonkeyPatch,
+) -> AsyncGenerator[AsyncClient, None]:
+    # reset database and caches
     await downgrade_db()
+    clear_caches()
+
+    # report each request's statements, see `request_statements`
+    monkeypatch.setattr(telemetry, "QUERY_STATS_HEADERS", True)
 
     # https://fastapi.tiangolo.com/advanced/testing-dependencies/
     app.dependency_overrides[get_user] = ignore_auth
@@ -21,3 +21,21 @@ REMOTE_DATABASE_URL = (
 SQLALCHEMY_DATABASE_URL = (
     LOCAL_DATABASE_URL if DB_NAME is None else REMOTE_DATABASE_URL
 )
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE") or 500)
+"""Trainings fetched (and sent) at a time when exporting the catalogue"""
+
+# connection pool, see https://docs.sqlalchemy.org/en/20/core/pooling.html
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE") or 5)
+"""Connections kept open"""
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW") or 10)
+"""Extra connections opened under load, closed once returned"""
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT") or 30)
+"""Seconds to wait for a connection before failing the request"""
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE") or -1)
+"""Seconds after which connections are replaced. -1 to never replace them"""
+DB_POOL_PRE_PING = (os.getenv("DB_POOL_PRE_PING") or "false") == "true"
+"""Test connections before using them, to survive database restarts"""
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE") or 100)
+"""Prepared statements cached per PostgreSQL connection. 0 disables the
+cache, which is needed behind PgBouncer in transaction mode"""
@@ -1,15 +1,41 @@
+from datetime import datetime
 from http import HTTPStatus
-from typing import List, Optional
+from typing import AbstractSet, Any, List, Optional, Tuple, TypeVar
 from fastapi import HTTPException
 
-from sqlalchemy import select
+from sqlalchemy import Select, delete, false, func, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api.model.training import (
     Training,
 )
+from src.db.loaders import training_loaders
 from src.db.model.favorite import DBFavorite
-from src.db.model.training import DBTraining
+from src.db.model.training import DBTraining, trainings_db_to_api
+from src.db.utils import upsert
+
+
+SelectT = TypeVar("SelectT", bound=Select[Any])
+
+
+def page_favorites(
+    query: SelectT,
+    offset: int,
+    limit: int,
+    user_id: Optional[int] = None,
+    after: Optional[int] = None,
+) -> SelectT:
+    """Restricts a query on trainings to a page of favorited ones"""
+    query = query.join(DBFavorite, DBFavorite.training_id == DBTraining.id)
+
+    if user_id is not None:
+        query = query.filter(DBFavorite.user_id == user_id)
+
+    if after is not None:
+        query = query.filter(DBFavorite.training_id > after)
+
+    return query.order_by(DBFavorite.training_id).offset(offset).limit(limit)
 
 
 async def get_favorites(
@@ -17,44 +43,128 @@ async def get_favorites(
     offset: int,
     limit: int,
     user_id: Optional[int] = None,
+    after: Optional[int] = None,
+    fields: Optional[AbstractSet[str]] = None,
 ) -> List[Training]:
-    """Get all the user's favorited trainings"""
-    query = select(DBFavorite)
+    """Get all the user's favorited trainings, ordered by training ID.
+    If `fields` is given, only those fields are loaded and set"""
+    query = select(DBTraining).options(*training_loaders(fields))
+    query = page_favorites(query, offset, limit, user_id, after)
 
-    if user_id is not None:
-        query = query.filter(DBFavorite.user_id == user_id)
+    res = await session.scalars(query)
+    trainings = res.all()
 
-    res = await session.scalars(query.offset(offset).limit(limit))
-    trainings = map(lambda f: f.training, res.all())
+    return trainings_db_to_api(trainings, fields)
 
-    return list(map(DBTraining.to_api_model, trainings))
+
+async def get_favorite_versions(
+    session: AsyncSession,
+    offset: int,
+    limit: int,
+    user_id: Optional[int] = None,
+    after: Optional[int] = None,
+) -> List[Tuple[int, int]]:
+    """Like `get_favorites`, but only gets the trainings' IDs and
+    versions"""
+    query = select(DBTraining.id, DBTraining.version)
+    query = page_favorites(query, offset, limit, user_id, after)
+
+    res = await session.execute(query)
+
+    return [(id, version) for id, version in res]
+
+
+async def get_popular_trainings(
+    session: AsyncSession, limit: int, since: Optional[datetime] = None
+) -> List[Training]:
+    """Gets the most favorited trainings, most favorited first. Blocked and
+    unfavorited trainings are left out.
+
+    If `since` is given, only favorites added after it are counted. Else,
+    the trainings are read in order from the index on `favorite_count`.
+    """
+    query = (
+        select(DBTraining)
+        .options(*training_loaders())
+        .filter(DBTraining.blocked == false())
+    )
+
+    if since is None:
+        query = query.filter(DBTraining.favorite_count > 0).order_by(
+            DBTraining.favorite_count.desc(), DBTraining.id.desc()
+        )
+    else:
+        recent = (
+            select(DBFavorite.training_id, func.count().label("favorites"))
+            .filter(DBFavorite.created_at >= since)
+            .group_by(DBFavorite.training_id)
+            .subquery()
+        )
+        query = query.join(
+            recent, recent.c.training_id == DBTraining.id
+        ).order_by(recent.c.favorites.desc(), DBTraining.id.desc())
+
+    res = await session.scalars(query.limit(limit))
+
+    return trainings_db_to_api(res.all())
+
+
+async def add_favorite_count(
+    session: AsyncSession, training_id: int, amount: int
+) -> None:
+    await session.execute(
+        update(DBTraining)
+        .where(DBTraining.id == training_id)
+        .values(
+            favorite_count=DBTraining.favorite_count + amount,
+            version=DBTraining.version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
 
 
 async def favorite(
     session: AsyncSession, user_id: int, training_id: int
-) -> None:
-    """Add a training to the user's favorites"""
-    training = await session.get(DBTraining, training_id)
+) -> bool:
+    """Add a training to the user's favorites. Returns whether it wasn't
+    already favorited"""
+    insert_favorite = upsert(session, DBFavorite).values(
+        user_id=user_id, training_id=training_id
+    )
+
+    try:
+        inserted = await session.scalar(
+            insert_favorite.on_conflict_do_nothing(
+                index_elements=[DBFavorite.user_id, DBFavorite.training_id]
+            ).returning(DBFavorite.id)
+        )
+    except IntegrityError as e:
+        # the only constraint left to break is the training's foreign key
+        raise HTTPException(HTTPStatus.NOT_FOUND, "Training not found") from e
 
-    if training is None:
-        raise HTTPException(HTTPStatus.NOT_FOUND, "Training not found")
+    if inserted is None:
+        return False
 
-    favorite = DBFavorite(user_id=user_id, training_id=training_id)
+    # in the same transaction, so the count matches the favorites
+    await add_favorite_count(session, training_id, 1)
+    await session.commit()
 
-    session.add(favorite)
+    return True
 
 
 async def unfavorite(
     session: AsyncSession, user_id: int, training_id: int
 ) -> None:
-    """Add a training to the user's favorites"""
-    favorite = await session.scalar(
-        select(DBFavorite)
+    """Remove a training from the user's favorites"""
+    deleted = await session.scalar(
+        delete(DBFavorite)
         .filter_by(user_id=user_id, training_id=training_id)
-        .limit(1)
+        .returning(DBFavorite.id)
+        .execution_options(synchronize_session=False)
     )
 
-    if favorite is None:
+    if deleted is None:
         raise HTTPException(HTTPStatus.NOT_FOUND, "Training's not favorited")
 
-    await session.delete(favorite)
+    await add_favorite_count(session, training_id, -1)
+    await session.commit()
@@ -0,0 +1,53 @@
+from typing import AbstractSet, Any, Dict, List, Optional
+
+from sqlalchemy.orm import load_only, selectinload
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from src.db.model.training import DBTraining
+
+
+FIELD_COLUMNS: Dict[str, List[InstrumentedAttribute[Any]]] = {
+    "id": [DBTraining.id],
+    "author": [DBTraining.author],
+    "blocked": [DBTraining.blocked],
+    "created_at": [DBTraining.created_at],
+    "title": [DBTraining.title],
+    "description": [DBTraining.description],
+    "type": [DBTraining.type],
+    "difficulty": [DBTraining.difficulty],
+    "score": [DBTraining.score_sum, DBTraining.score_count],
+    "score_amount": [DBTraining.score_count],
+    "favorite_count": [DBTraining.favorite_count],
+}
+"""Columns needed by each of the training's API fields"""
+
+
+def training_loaders(
+    fields: Optional[AbstractSet[str]] = None,
+) -> List[LoaderOption]:
+    """Loader options for fetching a training's child collections.
+
+    Each collection is fetched for all the trainings in the result with a
+    single `SELECT ... WHERE training_id IN (...)`, so the number of
+    statements doesn't depend on the page size.
+
+    If `fields` is given, only the columns and collections needed by those
+    API fields are loaded.
+    """
+    if fields is None:
+        return [
+            selectinload(DBTraining.multimedia),
+            selectinload(DBTraining.goals),
+        ]
+
+    columns = [c for f in fields for c in FIELD_COLUMNS.get(f, [])]
+    loaders: List[LoaderOption] = [load_only(*columns, raiseload=True)]
+
+    if "multimedia" in fields:
+        loaders.append(selectinload(DBTraining.multimedia))
+
+    if "goals" in fields:
+        loaders.append(selectinload(DBTraining.goals))
+
+    return loaders
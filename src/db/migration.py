@@ -1,50 +1,134 @@
-import logging
-from time import sleep
-from typing import Callable
+import asyncio
+import os
+import re
+from configparser import ConfigParser
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Optional, Set
 
-from alembic.config import Config
-from alembic import command
-from sqlalchemy import Connection
+from sqlalchemy import Connection, text
+from sqlalchemy.exc import DBAPIError
 
-from src.logging import error, debug
-from src.db.session import engine
+from src.logging import error, debug, info
+from src.db.session import engine, set_sqlite_foreign_keys
 
+if TYPE_CHECKING:
+    # alembic takes a while to import, and is only needed to migrate
+    from alembic.config import Config
+
+
+ALEMBIC_CONFIG = "alembic.ini"
+
+RUN_MIGRATIONS = (os.getenv("RUN_MIGRATIONS") or "true") == "true"
+"""Whether to upgrade the database on startup. Turn it off in all the
+replicas but one (or a migration job), so they don't race to migrate"""
+
+MIGRATION_RETRY_DELAY = 0.5
+MIGRATION_RETRY_MAX_DELAY = 30.0
+
+_REVISION = re.compile(r"^(down_)?revision\s*=\s*['\"]?(\w+)", re.MULTILINE)
+
+
+@lru_cache
+def script_head() -> Optional[str]:
+    """The latest revision in the migration scripts, found without
+    loading them. None if there isn't a single one"""
+    parser = ConfigParser()
+    parser.read(ALEMBIC_CONFIG)
+    versions = os.path.join(
+        parser.get("alembic", "script_location", fallback="alembic"),
+        "versions",
+    )
+
+    revisions: Set[str] = set()
+    parents: Set[str] = set()
+
+    for name in os.listdir(versions):
+        if not name.endswith(".py"):
+            continue
+
+        with open(os.path.join(versions, name)) as f:
+            for down, revision in _REVISION.findall(f.read()):
+                (parents if down else revisions).add(revision)
+
+    heads = revisions - parents
+    return heads.pop() if len(heads) == 1 else None
+
+
+async def is_at_head() -> bool:
+    """Checks the database's revision against the scripts' head with a
+    single query, so alembic is only loaded when there's work to do"""
+    head = script_head()
+
+    if head is None:
+        return False
+
+    try:
+        async with engine.connect() as conn:
+            versions = await conn.scalars(
+                text("SELECT version_num FROM alembic_version")
+            )
+            return list(versions) == [head]
+    except (DBAPIError, OSError):
+        # no alembic_version table yet, or no database to ask. The
+        # upgrade retries until there is one
+        return False
+
+
+def run_upgrade(conn: Connection, config: "Config") -> None:
+    from alembic import command
 
-def run_upgrade(conn: Connection, config: Config) -> None:
     debug("upgrading database.")
     config.attributes["connection"] = conn
     command.upgrade(config, "head")
 
 
-def run_downgrade(conn: Connection, config: Config) -> None:
+def run_downgrade(conn: Connection, config: "Config") -> None:
+    from alembic import command
+
     debug("resetting database.")
     config.attributes["connection"] = conn
     command.downgrade(config, "base")
 
 
 async def run_alembic_cmd(
-    cmd: Callable[[Connection, Config], None], retry: bool = False
+    cmd: Callable[[Connection, "Config"], None], retry: bool = False
 ) -> None:
+    from alembic.config import Config
+
+    delay = MIGRATION_RETRY_DELAY
+
     while True:
         try:
-            async with engine.begin() as conn:
-                alembic_cfg = Config("alembic.ini")
-                await conn.run_sync(cmd, alembic_cfg)
+            async with engine.connect() as conn:
+                # batch migrations recreate tables, which SQLite would
+                # refuse to drop while checking foreign keys
+                await set_sqlite_foreign_keys(conn, False)
+                try:
+                    async with conn.begin():
+                        alembic_cfg = Config(ALEMBIC_CONFIG)
+                        await conn.run_sync(cmd, alembic_cfg)
+                finally:
+                    await set_sqlite_foreign_keys(conn, True)
                 break
         except Exception as e:
             error(f"failed to upgrade. {e}")
             if not retry:
                 break
-            sleep(1)
-
-    # re-enable logging, as alembic seems to disable it ¯\_(ツ)_/¯
-    for logger in logging.root.manager.loggerDict.values():
-        if isinstance(logger, logging.Logger):
-            logger.disabled = False
+            # without blocking the event loop
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MIGRATION_RETRY_MAX_DELAY)
 
 
 async def upgrade_db() -> None:
-    """Upgrade DB via 'alembic upgrade head'"""
+    """Upgrade DB via 'alembic upgrade head', unless it's already there"""
+    if not RUN_MIGRATIONS:
+        info("Skipping migrations, RUN_MIGRATIONS is off")
+        return
+
+    if await is_at_head():
+        debug("database is up to date.")
+        return
+
     await run_alembic_cmd(run_upgrade, retry=True)
 
 
@@ -0,0 +1,54 @@
+from time import perf_counter
+
+import pytest
+from httpx import AsyncClient
+
+import src.db.migration as migration
+from src.db.migration import (
+    is_at_head,
+    run_alembic_cmd,
+    run_upgrade,
+    upgrade_db,
+)
+from src.test_utils import benchmark, count_statements
+
+
+async def test_upgrade_at_head_is_a_single_query(client: AsyncClient) -> None:
+    assert await is_at_head()
+
+    with count_statements() as statements:
+        await upgrade_db()
+
+    assert len(statements) == 1
+    assert "alembic_version" in statements[0][0]
+
+
+async def test_upgrade_db_opt_out(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(migration, "RUN_MIGRATIONS", False)
+
+    with count_statements() as statements:
+        await upgrade_db()
+
+    assert len(statements) == 0
+
+
+@benchmark
+async def test_cold_start_time(client: AsyncClient) -> None:
+    """Compares the startup migration's time when the database is up to
+    date, with and without the fast path. Run with `pytest -s` to see the
+    numbers."""
+    start = perf_counter()
+    await upgrade_db()
+    fast = perf_counter() - start
+
+    start = perf_counter()
+    await run_alembic_cmd(run_upgrade)
+    alembic = perf_counter() - start
+
+    print(
+        f"\nupgrade_db at head: {fast * 1e3:.1f}ms,"
+        f" {alembic * 1e3:.1f}ms through alembic"
+    )
+    assert fast < alembic
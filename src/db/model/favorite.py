@@ -1,6 +1,11 @@
+from datetime import datetime
 from sqlalchemy import (
+    DateTime,
     ForeignKey,
+    Index,
     Integer,
+    UniqueConstraint,
+    func,
 )
 from sqlalchemy.orm import Mapped, relationship, mapped_column
 
@@ -10,9 +15,20 @@ from src.db.model.training import DBTraining
 
 class DBFavorite(Base):
     __tablename__ = "favorites"
+    # a training is favorited at most once per user
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id", "training_id", name="uq_favorites_user_id_training_id"
+        ),
+        # recent favorites, by training
+        Index(
+            "ix_favorites_created_at_training_id", "created_at", "training_id"
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     training_id: Mapped[int] = mapped_column(ForeignKey("trainings.id"))
     user_id: Mapped[int] = mapped_column(Integer)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
 
-    training: Mapped[DBTraining] = relationship(lazy="joined")
+    training: Mapped[DBTraining] = relationship(lazy="raise_on_sql")
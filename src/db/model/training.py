@@ -1,12 +1,15 @@
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import AbstractSet, Any, Dict, List, Optional, Sequence
 from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Enum,
+    Float,
+    UniqueConstraint,
     func,
 )
 from sqlalchemy.orm import Mapped, relationship, mapped_column
@@ -18,12 +21,20 @@ from src.db.model.base import Base
 
 SCORE_SCALE: int = 100
 
+# Bayesian average prior: every training starts with RANKING_PRIOR_WEIGHT
+# virtual scores of RANKING_PRIOR_MEAN. Changing them needs a migration
+# that recomputes `training_rankings`
+RANKING_PRIOR_MEAN: float = 3.0
+RANKING_PRIOR_WEIGHT: int = 5
+
 
 class DBMultimedia(Base):
     __tablename__ = "training_multimedias"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    training_id: Mapped[int] = mapped_column(ForeignKey("trainings.id"))
+    training_id: Mapped[int] = mapped_column(
+        ForeignKey("trainings.id"), index=True
+    )
     url: Mapped[str] = mapped_column(String(255))
 
 
@@ -41,7 +52,9 @@ class DBGoal(Base):
     __tablename__ = "training_goals"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    training_id: Mapped[int] = mapped_column(ForeignKey("trainings.id"))
+    training_id: Mapped[int] = mapped_column(
+        ForeignKey("trainings.id"), index=True
+    )
     name: Mapped[str] = mapped_column(String(30))
     description: Mapped[str] = mapped_column(String(300))
 
@@ -56,6 +69,14 @@ def goals_db_to_api(db_goals: List[DBGoal]) -> List[Goal]:
 
 class DBScore(Base):
     __tablename__ = "training_scores"
+    # a single score per user and training, upserted by `add_score`
+    __table_args__ = (
+        UniqueConstraint(
+            "training_id",
+            "author",
+            name="uq_training_scores_training_id_author",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     training_id: Mapped[int] = mapped_column(ForeignKey("trainings.id"))
@@ -77,8 +98,52 @@ class DBScore(Base):
         self.score = round(score * SCORE_SCALE)
 
 
+def bayesian_score(score_sum: int, score_count: int) -> float:
+    """Mean score, pulled towards the prior mean when there are few scores.
+    `score_sum` is in DB units, like `DBTraining.score_sum`"""
+    prior_sum = RANKING_PRIOR_MEAN * RANKING_PRIOR_WEIGHT
+    total = prior_sum + score_sum / SCORE_SCALE
+
+    return total / (RANKING_PRIOR_WEIGHT + score_count)
+
+
+class DBRanking(Base):
+    """Ranking score of each scored training, kept up to date by
+    `add_score`. The filterable columns are copied from the training, so
+    top-N reads are a walk over an index"""
+
+    __tablename__ = "training_rankings"
+    __table_args__ = (
+        Index("ix_training_rankings_blocked_score", "blocked", "score"),
+        Index(
+            "ix_training_rankings_blocked_type_score",
+            "blocked",
+            "type",
+            "score",
+        ),
+    )
+
+    training_id: Mapped[int] = mapped_column(
+        ForeignKey("trainings.id"), primary_key=True
+    )
+    blocked: Mapped[bool] = mapped_column(Boolean)
+    type: Mapped[TrainingType] = mapped_column(Enum(TrainingType))
+    difficulty: Mapped[int] = mapped_column(Integer)
+    score: Mapped[float] = mapped_column(Float)
+
+
 class DBTraining(Base):
     __tablename__ = "trainings"
+    # match the filter combinations used in `get_all_trainings`
+    __table_args__ = (
+        Index("ix_trainings_blocked_id", "blocked", "id"),
+        Index("ix_trainings_blocked_type_id", "blocked", "type", "id"),
+        Index("ix_trainings_author_blocked_id", "author", "blocked", "id"),
+        Index("ix_trainings_blocked_difficulty", "blocked", "difficulty"),
+        Index(
+            "ix_trainings_blocked_favorite_count", "blocked", "favorite_count"
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     author: Mapped[int] = mapped_column(Integer)
@@ -88,17 +153,34 @@ class DBTraining(Base):
     description: Mapped[str] = mapped_column(String(300))
     type: Mapped[TrainingType] = mapped_column(Enum(TrainingType))
     difficulty: Mapped[int] = mapped_column(Integer)
+    # denormalized score aggregates, kept up to date by `add_score`
+    score_sum: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0"
+    )
+    score_count: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0"
+    )
+    # denormalized amount of favorites, kept up to date by `favorite` and
+    # `unfavorite`
+    favorite_count: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0"
+    )
+    # bumped on every change to the training, to tell its versions apart
+    version: Mapped[int] = mapped_column(
+        Integer, default=1, server_default="1"
+    )
+    # NOTE: child collections must be loaded explicitly (see src/db/loaders)
     multimedia: Mapped[List[DBMultimedia]] = relationship(
         cascade="all, delete-orphan",
-        lazy="immediate",
+        lazy="raise_on_sql",
     )
     goals: Mapped[List[DBGoal]] = relationship(
         cascade="all, delete-orphan",
-        lazy="immediate",
+        lazy="raise_on_sql",
     )
+    # NOTE: never loaded on reads, use `score_sum` and `score_count` instead
     scores: Mapped[List[DBScore]] = relationship(
         cascade="all, delete-orphan",
-        lazy="immediate",
     )
 
     @classmethod
@@ -127,14 +209,6 @@ class DBTraining(Base):
         multimedia = multimedia_db_to_api(self.multimedia)
         goals = goals_db_to_api(self.goals)
 
-        score_amount = len(self.scores)
-
-        if score_amount == 0:
-            score = 0.0
-        else:
-            score_total = sum((s.score for s in self.scores))
-            score = score_total / (score_amount * SCORE_SCALE)
-
         return Training(
             id=self.id,
             author=self.author,
@@ -146,10 +220,36 @@ class DBTraining(Base):
             difficulty=self.difficulty,
             multimedia=multimedia,
             goals=goals,
-            score=score,
-            score_amount=score_amount,
+            score=self.get_api_score(),
+            score_amount=self.score_count,
+            favorite_count=self.favorite_count,
         )
 
+    def to_sparse_api_model(self, fields: AbstractSet[str]) -> Training:
+        """Like `to_api_model`, but with only the given fields set.
+        The rest may not be loaded, so they are left out of the model"""
+        values: Dict[str, Any] = {}
+
+        for field in fields:
+            if field == "multimedia":
+                values[field] = multimedia_db_to_api(self.multimedia)
+            elif field == "goals":
+                values[field] = goals_db_to_api(self.goals)
+            elif field == "score":
+                values[field] = self.get_api_score()
+            elif field == "score_amount":
+                values[field] = self.score_count
+            else:
+                values[field] = getattr(self, field)
+
+        return Training.construct(set(fields), **values)
+
+    def get_api_score(self) -> float:
+        if self.score_count == 0:
+            return 0.0
+
+        return self.score_sum / (self.score_count * SCORE_SCALE)
+
     def update(
         self,
         author: Optional[int] = None,
@@ -174,3 +274,13 @@ class DBTraining(Base):
                 DBGoal(name=g["name"], description=g["description"])
                 for g in goals
             ]
+
+
+def trainings_db_to_api(
+    trainings: Sequence[DBTraining],
+    fields: Optional[AbstractSet[str]] = None,
+) -> List[Training]:
+    if fields is None:
+        return [t.to_api_model() for t in trainings]
+
+    return [t.to_sparse_api_model(fields) for t in trainings]
@@ -0,0 +1,74 @@
+from time import perf_counter
+from typing import Any
+
+from pydantic import BaseModel, Field
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, Pool
+
+
+class PoolStats(BaseModel):
+    size: int = Field(title="Size", description="Connections kept open")
+    checked_out: int = Field(
+        title="Checked out", description="Connections currently in use"
+    )
+    overflow: int = Field(
+        title="Overflow",
+        description="Connections open beyond the pool's size",
+    )
+    checkouts: int = Field(
+        title="Checkouts", description="Connections handed out"
+    )
+    timeouts: int = Field(
+        title="Timeouts",
+        description="Checkouts that gave up waiting for a connection",
+    )
+    wait_time_total: float = Field(
+        title="Total wait time",
+        description="Seconds spent waiting for (or opening) connections",
+    )
+    wait_time_max: float = Field(
+        title="Max wait time",
+        description="Longest wait for a connection, in seconds",
+    )
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that also measures how long checkouts wait for a
+    connection. High waits mean requests are slow because the pool is
+    saturated, not because of their queries"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = perf_counter()
+
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            wait_time = perf_counter() - start
+            self.checkouts += 1
+            self.wait_time_total += wait_time
+            self.wait_time_max = max(self.wait_time_max, wait_time)
+
+
+def get_pool_stats(pool: Pool) -> PoolStats:
+    # the engine is always created with this pool class
+    assert isinstance(pool, TimedQueuePool)
+
+    return PoolStats(
+        size=pool.size(),
+        checked_out=pool.checkedout(),
+        overflow=max(pool.overflow(), 0),
+        checkouts=pool.checkouts,
+        timeouts=pool.timeouts,
+        wait_time_total=pool.wait_time_total,
+        wait_time_max=pool.wait_time_max,
+    )
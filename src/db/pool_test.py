@@ -0,0 +1,32 @@
+import pytest
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.db.config import LOCAL_DATABASE_URL
+from src.db.pool import TimedQueuePool, get_pool_stats
+
+
+async def test_pool_measures_waits() -> None:
+    engine = create_async_engine(
+        LOCAL_DATABASE_URL,
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+
+    async with engine.connect():
+        stats = get_pool_stats(engine.pool)
+        assert (stats.checked_out, stats.checkouts) == (1, 1)
+
+        with pytest.raises(TimeoutError):
+            async with engine.connect():
+                pass
+
+    stats = get_pool_stats(engine.pool)
+    assert (stats.size, stats.checked_out, stats.overflow) == (1, 0, 0)
+    assert (stats.checkouts, stats.timeouts) == (2, 1)
+    assert stats.wait_time_max >= 0.1
+    assert stats.wait_time_total >= stats.wait_time_max
+
+    await engine.dispose()
@@ -0,0 +1,72 @@
+from typing import Any, Dict, List
+import pytest
+from httpx import AsyncClient
+from http import HTTPStatus
+
+from src.api.model.training import Training
+from src.api.pagination import encode_cursor
+from src.db.session import engine
+from src.test_utils import count_statements
+
+
+HOT_QUERIES: List[tuple[str, Dict[str, Any]]] = [
+    ("/trainings", {}),
+    ("/trainings", {"cursor": encode_cursor(1)}),
+    ("/trainings", {"type": "walk"}),
+    ("/trainings", {"author": "me"}),
+    ("/trainings", {"author": "me", "cursor": encode_cursor(1)}),
+    ("/trainings", {"mindiff": 1, "maxdiff": 3}),
+    ("/trainings/count", {}),
+    ("/trainings/count", {"type": "running"}),
+    ("/trainings/count", {"author": "me"}),
+    ("/trainings/count", {"mindiff": 1, "maxdiff": 3}),
+    ("/trainings/search", {"q": "title"}),
+    ("/trainings/search", {"q": "title", "type": "walk"}),
+    ("/trainings/top", {}),
+    ("/trainings/top", {"type": "walk"}),
+    ("/trainings/popular", {}),
+    ("/trainings/popular", {"days": 7}),
+    ("/favorites", {}),
+    ("/favorites", {"cursor": encode_cursor(1)}),
+]
+
+
+def is_full_scan(detail: str) -> bool:
+    # "SCAN" means a full table/index scan, "SEARCH" an index lookup.
+    # FTS5 tables are always "SCAN"ned, but MATCH (":M") uses their index
+    if "VIRTUAL TABLE INDEX" in detail:
+        return ":M" not in detail
+
+    # materialized subqueries are scanned, but their reads are checked
+    # on their own
+    if detail.startswith("SCAN anon_"):
+        return False
+
+    return detail.startswith("SCAN")
+
+
+async def explain(statement: str, parameters: Any) -> List[str]:
+    async with engine.connect() as conn:
+        res = await conn.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        )
+        return [row[3] for row in res]
+
+
+@pytest.mark.skipif(
+    engine.dialect.name != "sqlite", reason="uses SQLite's query plans"
+)
+async def test_hot_queries_use_indexes(
+    favorited_training: Training, client: AsyncClient
+) -> None:
+    score_url = f"/trainings/{favorited_training.id}/scores"
+    queries = [*HOT_QUERIES, (f"{score_url}/me", {})]
+
+    for url, params in queries:
+        with count_statements() as statements:
+            response = await client.get(url, params=params)
+        assert response.status_code in [HTTPStatus.OK, HTTPStatus.NOT_FOUND]
+
+        for statement, parameters in statements:
+            for detail in await explain(statement, parameters):
+                assert not is_full_scan(detail), (url, params, detail)
@@ -0,0 +1,151 @@
+import re
+from typing import Any, List, Sequence, Tuple
+
+from sqlalchemy import (
+    Column,
+    Insert,
+    Integer,
+    MetaData,
+    Select,
+    Table,
+    Text,
+    cast,
+    func,
+    insert,
+    literal,
+    literal_column,
+    select,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.expression import ColumnClause
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.model.training import DBGoal, DBTraining
+
+
+SEARCH_TABLE = "training_search"
+"""Full-text index of the trainings. Its shape depends on the database, so
+it's created by hand in the migrations instead of being a model"""
+
+SEARCH_CONFIG = "simple"
+"""PostgreSQL text search configuration. Trainings are written in many
+languages, so words aren't stemmed (like SQLite's tokenizer)"""
+
+# relative weights of the title, description and goal names
+SQLITE_WEIGHTS = (10.0, 5.0, 2.0)
+POSTGRES_WEIGHTS = ("A", "B", "C")
+
+# SQLite: FTS5 virtual table, with the training's ID as rowid
+fts_table = Table(
+    SEARCH_TABLE,
+    MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("title", Text),
+    Column("description", Text),
+    Column("goals", Text),
+)
+
+# PostgreSQL: weighted tsvector by training, with a GIN index
+tsvector_table = Table(
+    SEARCH_TABLE,
+    MetaData(),
+    Column("training_id", Integer, primary_key=True),
+    Column("document", postgresql.TSVECTOR),
+)
+
+
+def search_terms(q: str) -> List[str]:
+    """Words in the search query. Operators and punctuation are dropped,
+    so any input is a valid query"""
+    return re.findall(r"\w+", q)
+
+
+def _to_tsvector(text: Any, weight: str) -> Any:
+    config = cast(literal(SEARCH_CONFIG), postgresql.REGCONFIG)
+    # setweight takes a "char", which a bound varchar isn't cast to
+    return func.setweight(
+        func.to_tsvector(config, text), literal_column(f"'{weight}'")
+    )
+
+
+def index_statement(dialect: str, ids: Sequence[int]) -> Insert:
+    """Statement that adds the trainings to the search index, or updates
+    their entries"""
+    if dialect == "postgresql":
+        goals = (
+            select(func.string_agg(DBGoal.name, " "))
+            .where(DBGoal.training_id == DBTraining.id)
+            .scalar_subquery()
+        )
+        title, description, goal_names = POSTGRES_WEIGHTS
+        document = (
+            _to_tsvector(DBTraining.title, title)
+            .op("||")(_to_tsvector(DBTraining.description, description))
+            .op("||")(_to_tsvector(func.coalesce(goals, ""), goal_names))
+        )
+        rows = select(DBTraining.id, document).where(DBTraining.id.in_(ids))
+        stmt = postgresql.Insert(tsvector_table).from_select(
+            ["training_id", "document"], rows
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=[tsvector_table.c.training_id],
+            set_={"document": stmt.excluded.document},
+        )
+
+    goals = (
+        select(func.group_concat(DBGoal.name, " "))
+        .where(DBGoal.training_id == DBTraining.id)
+        .scalar_subquery()
+    )
+    rows = select(
+        DBTraining.id,
+        DBTraining.title,
+        DBTraining.description,
+        func.coalesce(goals, ""),
+    ).where(DBTraining.id.in_(ids))
+    # FTS5 replaces the entry with the same rowid
+    return (
+        insert(fts_table)
+        .prefix_with("OR REPLACE")
+        .from_select(["rowid", "title", "description", "goals"], rows)
+    )
+
+
+async def index_trainings(session: AsyncSession, ids: Sequence[int]) -> None:
+    """Adds the trainings to the search index, or updates their entries.
+    Call in the same transaction that creates or edits them"""
+    if len(ids) == 0:
+        return
+
+    dialect = session.get_bind().dialect.name
+    await session.execute(index_statement(dialect, ids))
+
+
+def search_query(dialect: str, terms: List[str]) -> Select[Tuple[DBTraining]]:
+    """Trainings matching all the terms, best matches first"""
+    if dialect == "postgresql":
+        config = cast(literal(SEARCH_CONFIG), postgresql.REGCONFIG)
+        tsquery = func.plainto_tsquery(config, " ".join(terms))
+        document = tsvector_table.c.document
+
+        return (
+            select(DBTraining)
+            .join(
+                tsvector_table,
+                tsvector_table.c.training_id == DBTraining.id,
+            )
+            .where(document.op("@@")(tsquery))
+            .order_by(func.ts_rank(document, tsquery).desc(), DBTraining.id)
+        )
+
+    # quoted, so terms are never taken as FTS5 operators
+    match = " ".join(f'"{term}"' for term in terms)
+    table: ColumnClause[Any] = literal_column(SEARCH_TABLE)
+
+    return (
+        select(DBTraining)
+        .join(fts_table, fts_table.c.rowid == DBTraining.id)
+        .where(table.op("MATCH")(match))
+        # lower is better
+        .order_by(func.bm25(table, *SQLITE_WEIGHTS), DBTraining.id)
+    )
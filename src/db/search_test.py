@@ -0,0 +1,27 @@
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from src.db.search import index_statement, search_query
+
+
+# CI runs the search tests on PostgreSQL, and local runs on SQLite. These
+# compile the PostgreSQL statements, so they're also checked locally
+POSTGRES = asyncpg.dialect()  # type: ignore
+
+
+def test_postgres_index_statement() -> None:
+    stmt = index_statement("postgresql", [1, 2])
+    sql = str(stmt.compile(dialect=POSTGRES))
+
+    # setweight takes a "char", which bound strings aren't cast to
+    assert sql.count("setweight(") == 3
+    for weight in ["A", "B", "C"]:
+        assert f"), '{weight}')" in sql
+    assert "ON CONFLICT (training_id) DO UPDATE" in sql
+
+
+def test_postgres_search_query() -> None:
+    stmt = search_query("postgresql", ["run", "fast"])
+    sql = str(stmt.compile(dialect=POSTGRES))
+
+    assert "training_search.document @@ plainto_tsquery(" in sql
+    assert "ORDER BY ts_rank(training_search.document" in sql
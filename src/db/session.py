@@ -1,10 +1,62 @@
-from sqlalchemy.ext.asyncio import create_async_engine
+from typing import Any, Dict
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
-from src.db.config import SQLALCHEMY_DATABASE_URL
+from src.db.config import (
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_STATEMENT_CACHE_SIZE,
+    SQLALCHEMY_DATABASE_URL,
+)
+from src.db.pool import TimedQueuePool
+
+
+def connect_args() -> Dict[str, Any]:
+    if not SQLALCHEMY_DATABASE_URL.startswith("postgresql+asyncpg"):
+        return {}
 
+    # the first is SQLAlchemy's prepared statement cache, the second asyncpg's
+    return {
+        "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+    }
 
-engine = create_async_engine(SQLALCHEMY_DATABASE_URL)
+
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=TimedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args=connect_args(),
+)
 SessionLocal = async_sessionmaker(
     engine, autocommit=False, autoflush=False, expire_on_commit=False
 )
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def enable_sqlite_foreign_keys(dbapi_connection: Any, _: Any) -> None:
+    """SQLite only checks foreign keys when asked to, unlike PostgreSQL"""
+    if engine.dialect.name != "sqlite":
+        return
+
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+async def set_sqlite_foreign_keys(conn: AsyncConnection, on: bool) -> None:
+    """Toggles foreign key checks on a SQLite connection, outside of any
+    transaction"""
+    if conn.dialect.name != "sqlite":
+        return
+
+    await conn.exec_driver_sql(f"PRAGMA foreign_keys={'ON' if on else 'OFF'}")
+    await conn.commit()
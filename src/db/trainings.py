@@ -1,19 +1,110 @@
 from http import HTTPStatus
-from typing import List, Optional
+from typing import (
+    AbstractSet,
+    Any,
+    AsyncIterator,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    cast,
+)
 from fastapi import HTTPException
 
-from sqlalchemy import func, select
+from sqlalchemy import Select, case, false, func, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api.model.training import (
+    MAX_DIFFICULTY,
+    MIN_DIFFICULTY,
+    BatchItemResult,
     CreateTraining,
     PatchTraining,
     ScoreBody,
     Training,
     TrainingCount,
+    TrainingPage,
 )
 from src.common.model import TrainingType
-from src.db.model.training import DBScore, DBTraining
+from src.db.config import EXPORT_CHUNK_SIZE
+from src.db.loaders import training_loaders
+from src.db.model.training import (
+    SCORE_SCALE,
+    DBGoal,
+    DBMultimedia,
+    DBRanking,
+    DBScore,
+    DBTraining,
+    bayesian_score,
+    trainings_db_to_api,
+)
+from src.db.search import index_trainings, search_query, search_terms
+from src.db.utils import upsert
+
+
+SelectT = TypeVar("SelectT", bound=Select[Any])
+
+
+def filter_trainings(
+    query: SelectT,
+    mindiff: int,
+    maxdiff: int,
+    blocked: Optional[bool] = None,
+    user: Optional[int] = None,
+    type: Optional[TrainingType] = None,
+) -> SelectT:
+    """Applies the listing filters to a query over trainings"""
+    if blocked is not None:
+        query = query.filter(DBTraining.blocked == blocked)
+
+    if user is not None:
+        query = query.filter(DBTraining.author == user)
+
+    if type is not None:
+        query = query.filter(DBTraining.type == type)
+
+    # skip bounds that don't filter anything, so the query planner is free
+    # to pick the indexes matching the other filters
+    if mindiff > MIN_DIFFICULTY:
+        query = query.filter(DBTraining.difficulty >= mindiff)
+
+    if maxdiff <= MAX_DIFFICULTY:
+        query = query.filter(DBTraining.difficulty < maxdiff)
+
+    return query
+
+
+def count_query(
+    mindiff: int,
+    maxdiff: int,
+    blocked: Optional[bool] = None,
+    user: Optional[int] = None,
+    type: Optional[TrainingType] = None,
+) -> Select[Tuple[int]]:
+    query = select(func.count()).select_from(DBTraining)
+    return filter_trainings(query, mindiff, maxdiff, blocked, user, type)
+
+
+def page_query(
+    offset: int,
+    limit: int,
+    mindiff: int,
+    maxdiff: int,
+    blocked: Optional[bool] = None,
+    user: Optional[int] = None,
+    type: Optional[TrainingType] = None,
+    after: Optional[int] = None,
+    fields: Optional[AbstractSet[str]] = None,
+) -> Select[Tuple[DBTraining]]:
+    query = select(DBTraining).options(*training_loaders(fields))
+    query = filter_trainings(query, mindiff, maxdiff, blocked, user, type)
+
+    if after is not None:
+        query = query.filter(DBTraining.id > after)
+
+    return query.order_by(DBTraining.id).offset(offset).limit(limit)
 
 
 async def get_all_trainings(
@@ -25,64 +116,210 @@ async def get_all_trainings(
     blocked: Optional[bool] = None,
     user: Optional[int] = None,
     type: Optional[TrainingType] = None,
+    after: Optional[int] = None,
+    fields: Optional[AbstractSet[str]] = None,
 ) -> List[Training]:
-    query = select(DBTraining)
+    """Gets a page of trainings, ordered by ID.
+
+    If `after` is given, the page starts after the training with that ID
+    (keyset pagination), which is stable and doesn't scan skipped rows.
+    If `fields` is given, only those fields are loaded and set.
+    """
+    query = page_query(
+        offset, limit, mindiff, maxdiff, blocked, user, type, after, fields
+    )
 
-    if blocked is not None:
-        query = query.filter_by(blocked=blocked)
+    res = await session.scalars(query)
+    trainings = res.all()
+
+    return trainings_db_to_api(trainings, fields)
 
-    if user is not None:
-        query = query.filter_by(author=user)
+
+async def search_trainings(
+    session: AsyncSession,
+    q: str,
+    offset: int,
+    limit: int,
+    mindiff: int,
+    maxdiff: int,
+    blocked: Optional[bool] = None,
+    user: Optional[int] = None,
+    type: Optional[TrainingType] = None,
+    fields: Optional[AbstractSet[str]] = None,
+) -> List[Training]:
+    """Gets a page of the trainings whose title, description or goal names
+    contain all the words in `q`, best matches first.
+
+    Matches are looked up in the search index, so the cost depends on the
+    amount of matches rather than on the size of the catalogue.
+    """
+    terms = search_terms(q)
+
+    if len(terms) == 0:
+        return []
+
+    dialect = session.get_bind().dialect.name
+    query = search_query(dialect, terms).options(*training_loaders(fields))
+    query = filter_trainings(query, mindiff, maxdiff, blocked, user, type)
+
+    res = await session.scalars(query.offset(offset).limit(limit))
+
+    return trainings_db_to_api(res.all(), fields)
+
+
+async def get_top_trainings(
+    session: AsyncSession,
+    limit: int,
+    mindiff: int,
+    maxdiff: int,
+    type: Optional[TrainingType] = None,
+) -> List[Training]:
+    """Gets the best ranked trainings, best first. Blocked and unscored
+    trainings are left out.
+
+    The ranking is read in order from an index, so the cost depends on
+    `limit` rather than on the amount of trainings.
+    """
+    query = (
+        select(DBTraining)
+        .join(DBRanking, DBRanking.training_id == DBTraining.id)
+        .options(*training_loaders())
+        .filter(DBRanking.blocked == false())
+    )
 
     if type is not None:
-        query = query.filter_by(type=type)
+        query = query.filter(DBRanking.type == type)
+
+    if mindiff > MIN_DIFFICULTY:
+        query = query.filter(DBRanking.difficulty >= mindiff)
+
+    if maxdiff <= MAX_DIFFICULTY:
+        query = query.filter(DBRanking.difficulty < maxdiff)
+
+    query = query.order_by(
+        DBRanking.score.desc(), DBRanking.training_id.desc()
+    ).limit(limit)
 
-    query = query.filter(
-        DBTraining.difficulty >= mindiff, DBTraining.difficulty < maxdiff
+    res = await session.scalars(query)
+
+    return trainings_db_to_api(res.all())
+
+
+async def stream_trainings(
+    session: AsyncSession,
+    mindiff: int,
+    maxdiff: int,
+    blocked: Optional[bool] = None,
+    user: Optional[int] = None,
+    type: Optional[TrainingType] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> AsyncIterator[List[Training]]:
+    """Streams all the trainings matching the filters, ordered by ID, in
+    chunks of `chunk_size`.
+
+    Rows are read from a server-side cursor, so memory use doesn't depend
+    on the amount of trainings.
+    """
+    query = select(DBTraining).options(*training_loaders())
+    query = filter_trainings(query, mindiff, maxdiff, blocked, user, type)
+    query = query.order_by(DBTraining.id).execution_options(
+        yield_per=chunk_size
     )
 
-    res = await session.scalars(query.offset(offset).limit(limit))
-    trainings = res.all()
+    result = await session.stream_scalars(query)
 
-    return list(map(DBTraining.to_api_model, trainings))
+    async for chunk in result.partitions():
+        yield trainings_db_to_api(chunk)
 
 
-async def count_trainings(
+async def get_trainings_page(
     session: AsyncSession,
+    offset: int,
+    limit: int,
     mindiff: int,
     maxdiff: int,
     blocked: Optional[bool] = None,
     user: Optional[int] = None,
     type: Optional[TrainingType] = None,
-) -> TrainingCount:
-    """Counts the number of services"""
-    query = select(func.count()).select_from(DBTraining)
+    after: Optional[int] = None,
+    fields: Optional[AbstractSet[str]] = None,
+) -> TrainingPage:
+    """Like `get_all_trainings`, but also counts all the trainings matching
+    the filters in the same query"""
+    total = count_query(mindiff, maxdiff, blocked, user, type)
+    query = page_query(
+        offset, limit, mindiff, maxdiff, blocked, user, type, after, fields
+    ).add_columns(total.scalar_subquery().correlate(None))
+
+    rows = (await session.execute(query)).all()
+
+    if len(rows) > 0:
+        count = rows[0][1]
+    elif offset == 0 and after is None:
+        count = 0
+    else:
+        # the page is past the end, so we have no row to read it from
+        count = (await session.scalar(total)) or 0
 
-    if blocked is not None:
-        query = query.filter_by(blocked=blocked)
+    items = trainings_db_to_api([training for training, _ in rows], fields)
 
-    if user is not None:
-        query = query.filter_by(author=user)
+    return TrainingPage(items=items, total=count)
 
-    if type is not None:
-        query = query.filter_by(type=type)
 
-    query = query.filter(
-        DBTraining.difficulty >= mindiff, DBTraining.difficulty < maxdiff
-    )
+async def count_trainings(
+    session: AsyncSession,
+    mindiff: int,
+    maxdiff: int,
+    blocked: Optional[bool] = None,
+    user: Optional[int] = None,
+    type: Optional[TrainingType] = None,
+) -> TrainingCount:
+    """Counts the number of services"""
+    query = count_query(mindiff, maxdiff, blocked, user, type)
 
     count = (await session.scalar(query)) or 0
 
     return TrainingCount(count=count)
 
 
-async def get_training_by_id(session: AsyncSession, id: int) -> Training:
-    training = await session.get(DBTraining, id)
+async def get_training_by_id(
+    session: AsyncSession, id: int
+) -> Tuple[Training, int]:
+    """Gets the training with the specified id, and its version"""
+    training = await session.get(DBTraining, id, options=training_loaders())
 
     if training is None:
         raise HTTPException(HTTPStatus.NOT_FOUND, "Training not found")
 
-    return training.to_api_model()
+    return training.to_api_model(), training.version
+
+
+async def get_trainings_by_ids(
+    session: AsyncSession, ids: List[int]
+) -> List[Training]:
+    """Gets the trainings with the given IDs, in the same order. Blocked
+    and missing trainings are left out"""
+    query = (
+        select(DBTraining)
+        .options(*training_loaders())
+        .filter(DBTraining.id.in_(ids), DBTraining.blocked == false())
+    )
+    res = await session.scalars(query)
+    trainings = {t.id: t for t in res.all()}
+
+    return trainings_db_to_api(
+        [trainings[id] for id in ids if id in trainings]
+    )
+
+
+async def get_training_version(session: AsyncSession, id: int) -> int:
+    """Gets only the version of the training with the specified id"""
+    version = await session.scalar(select(DBTraining.version).filter_by(id=id))
+
+    if version is None:
+        raise HTTPException(HTTPStatus.NOT_FOUND, "Training not found")
+
+    return version
 
 
 async def check_title_is_unique(session: AsyncSession, title: str) -> None:
@@ -101,17 +338,120 @@ async def create_training(
 
     await check_title_is_unique(session, training.title)  # type: ignore
     session.add(new_training)
+    await session.flush()
+    await index_trainings(session, [new_training.id])
     await session.commit()
 
     return new_training.to_api_model()
 
 
+async def create_trainings(
+    session: AsyncSession, author: int, trainings: List[CreateTraining]
+) -> List[BatchItemResult]:
+    """Creates all the trainings whose title isn't taken, in a single
+    transaction. Returns the result of each one, in order"""
+    titles = [t.title for t in trainings]
+    taken: Set[Optional[str]] = set(
+        await session.scalars(
+            select(DBTraining.title).where(DBTraining.title.in_(titles))
+        )
+    )
+
+    new_trainings: Dict[str, CreateTraining] = {}
+
+    for training in trainings:
+        # required in CreateTraining, but typed as in PatchTraining
+        title = cast(str, training.title)
+
+        if title not in taken:
+            taken.add(title)
+            new_trainings[title] = training
+
+    created: Dict[str, Training] = {}
+
+    if len(new_trainings) > 0:
+        # bulk INSERTs, with a single statement per table. RETURNING rows
+        # come in any order, so they're matched by their unique title
+        rows = await session.execute(
+            insert(DBTraining).returning(
+                DBTraining.id, DBTraining.title, DBTraining.created_at
+            ),
+            [
+                {
+                    "author": author,
+                    "blocked": False,
+                    "title": t.title,
+                    "description": t.description,
+                    "type": t.type,
+                    "difficulty": t.difficulty,
+                }
+                for t in new_trainings.values()
+            ],
+        )
+
+        for id, title, created_at in rows:
+            created[title] = Training(
+                **new_trainings[title].dict(),
+                id=id,
+                author=author,
+                blocked=False,
+                createdAt=created_at,
+                score=0.0,
+                score_amount=0,
+                favorite_count=0,
+            )
+
+        goals = [
+            {"training_id": t.id, **g.dict()}
+            for t in created.values()
+            for g in t.goals or []
+        ]
+        multimedia = [
+            {"training_id": t.id, "url": str(m)}
+            for t in created.values()
+            for m in t.multimedia or []
+        ]
+
+        if len(goals) > 0:
+            await session.execute(insert(DBGoal), goals)
+
+        if len(multimedia) > 0:
+            await session.execute(insert(DBMultimedia), multimedia)
+
+        await index_trainings(session, [t.id for t in created.values()])
+
+    await session.commit()
+
+    results = []
+
+    for training in trainings:
+        # only the first training with each title was created
+        new_training = created.pop(training.title or "", None)
+
+        if new_training is None:
+            detail = (
+                f'A training with the title "{training.title}" '
+                "already exists"
+            )
+            results.append(
+                BatchItemResult(status=HTTPStatus.CONFLICT, detail=detail)
+            )
+        else:
+            results.append(
+                BatchItemResult(
+                    status=HTTPStatus.CREATED, training=new_training
+                )
+            )
+
+    return results
+
+
 async def patch_training(
     session: AsyncSession, author: int, id: int, patch: PatchTraining
 ) -> Training:
     """Updates the training's info"""
 
-    training = await session.get(DBTraining, id)
+    training = await session.get(DBTraining, id, options=training_loaders())
 
     if training is None:
         raise HTTPException(HTTPStatus.NOT_FOUND, "Training not found")
@@ -125,8 +465,21 @@ async def patch_training(
         )
 
     training.update(**patch.dict())
+    training.version = DBTraining.version + 1
 
     session.add(training)
+
+    if patch.type is not None or patch.difficulty is not None:
+        await session.execute(
+            update(DBRanking)
+            .where(DBRanking.training_id == id)
+            .values(type=training.type, difficulty=training.difficulty)
+        )
+
+    if patch.title or patch.description or patch.goals is not None:
+        await session.flush()
+        await index_trainings(session, [id])
+
     await session.commit()
 
     return training.to_api_model()
@@ -138,14 +491,20 @@ async def change_block_status(
     new_block_status: bool,
 ) -> Training:
     """Updates the training's block status"""
-    training = await session.get(DBTraining, id)
+    training = await session.get(DBTraining, id, options=training_loaders())
 
     if training is None:
         raise HTTPException(HTTPStatus.NOT_FOUND, "Training not found")
 
     training.blocked = new_block_status
+    training.version = DBTraining.version + 1
 
     session.add(training)
+    await session.execute(
+        update(DBRanking)
+        .where(DBRanking.training_id == id)
+        .values(blocked=new_block_status)
+    )
     await session.commit()
 
     return training.to_api_model()
@@ -176,21 +535,68 @@ async def add_score(
     score: ScoreBody,
 ) -> ScoreBody:
     """Adds a new score to the given training, or edits existing ones"""
-    training = await session.get(DBTraining, id)
+    # lock the training, so concurrent scores update its aggregates in turn
+    training_id = await session.scalar(
+        select(DBTraining.id).filter_by(id=id).with_for_update()
+    )
 
-    if training is None:
+    if training_id is None:
         raise HTTPException(HTTPStatus.NOT_FOUND, "Training not found")
 
-    db_score = await session.scalar(
-        select(DBScore).filter_by(training_id=id, author=user).limit(1)
+    new_score = round(score.score * SCORE_SCALE)
+    old_score = (
+        select(DBScore.score)
+        .filter_by(training_id=id, author=user)
+        .scalar_subquery()
     )
 
-    if db_score is None:
-        db_score = DBScore.from_api(id, user, score.score)
-    else:
-        db_score.update_score(score.score)
+    # keep the training's aggregates in sync, in the same transaction
+    training = await session.execute(
+        update(DBTraining)
+        .where(DBTraining.id == id)
+        .values(
+            score_sum=DBTraining.score_sum
+            + new_score
+            - func.coalesce(old_score, 0),
+            score_count=DBTraining.score_count
+            + case((old_score.is_(None), 1), else_=0),
+            version=DBTraining.version + 1,
+        )
+        .returning(
+            DBTraining.score_sum,
+            DBTraining.score_count,
+            DBTraining.blocked,
+            DBTraining.type,
+            DBTraining.difficulty,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    score_sum, score_count, blocked, type, difficulty = training.one()
+
+    insert_score = upsert(session, DBScore).values(
+        training_id=id, author=user, score=new_score
+    )
+    await session.execute(
+        insert_score.on_conflict_do_update(
+            index_elements=[DBScore.training_id, DBScore.author],
+            set_={DBScore.score: insert_score.excluded.score},
+        )
+    )
 
-    session.add(db_score)
+    # the new aggregates are enough to rank the training again
+    insert_ranking = upsert(session, DBRanking).values(
+        training_id=id,
+        blocked=blocked,
+        type=type,
+        difficulty=difficulty,
+        score=bayesian_score(score_sum, score_count),
+    )
+    await session.execute(
+        insert_ranking.on_conflict_do_update(
+            index_elements=[DBRanking.training_id],
+            set_={DBRanking.score: insert_ranking.excluded.score},
+        )
+    )
     await session.commit()
 
-    return ScoreBody(score=db_score.get_api_score())
+    return ScoreBody(score=new_score / SCORE_SCALE)
@@ -1,6 +1,8 @@
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Type, Union
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.db.model.base import Base
 from src.db.session import SessionLocal
 
 
@@ -8,3 +10,14 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with SessionLocal() as session:
         async with session.begin():
             yield session
+
+
+def upsert(
+    session: AsyncSession, model: Type[Base]
+) -> Union[postgresql.Insert, sqlite.Insert]:
+    """INSERT statement supporting ON CONFLICT clauses in the session's
+    database dialect"""
+    if session.get_bind().dialect.name == "postgresql":
+        return postgresql.Insert(model)
+
+    return sqlite.Insert(model)
@@ -23,7 +23,7 @@ def error(msg: str) -> None:
     get_uvicorn_logger().error(msg)
 
 
-# disable /health endpoint logging
+# disable /health and /metrics endpoint logging
 class EndpointFilter(logging.Filter):
     def filter(self, record: logging.LogRecord) -> bool:
         if record.args is None or len(record.args) < 3:
@@ -32,7 +32,7 @@ class EndpointFilter(logging.Filter):
         if not isinstance(record.args, tuple):
             return True
 
-        return record.args[2] not in ["/health", "/openapi.json"]
+        return record.args[2] not in ["/health", "/metrics", "/openapi.json"]
 
 
 logging.getLogger("uvicorn.access").addFilter(EndpointFilter())
@@ -3,13 +3,22 @@ from contextlib import asynccontextmanager
 from typing import AsyncGenerator, Dict
 
 from fastapi import FastAPI
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, PlainTextResponse
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.middleware import Middleware
 
 from src.auth import ApikeyMiddleware
 from src.logging import info
 from src.db.migration import upgrade_db
+from src.db.session import engine
+from src.metrics.reports import REPORTS
+from src.related import RELATED
+from src.telemetry import (
+    CONTENT_TYPE,
+    RequestMetricsMiddleware,
+    instrument_engine,
+    render_metrics,
+)
 
 
 @asynccontextmanager
@@ -20,8 +29,16 @@ async def lifespan(
 
     await upgrade_db()
 
+    REPORTS.start()
+    RELATED.start()
+
     yield
 
+    info("Sending pending reports")
+
+    await REPORTS.stop()
+    await RELATED.stop()
+
 
 app = FastAPI(
     lifespan=lifespan,
@@ -29,9 +46,14 @@ app = FastAPI(
     version="0.1.0",
     description="Kinetix's trainings service API",
     docs_url=None,
-    middleware=[Middleware(ApikeyMiddleware)],
+    middleware=[
+        Middleware(RequestMetricsMiddleware),
+        Middleware(ApikeyMiddleware),
+    ],
 )
 
+instrument_engine(engine.sync_engine)
+
 
 origins_regex = re.compile(
     (
@@ -50,9 +72,11 @@ def add_subrouters(app: FastAPI) -> None:
     """Set up subrouters"""
     from src.api.trainings import router as trainings_router
     from src.api.favorites import router as favorites_router
+    from src.api.stats import router as stats_router
 
     app.include_router(trainings_router)
     app.include_router(favorites_router)
+    app.include_router(stats_router)
 
 
 add_subrouters(app)
@@ -69,6 +93,12 @@ def health_check() -> Dict[str, str]:
     return {"status": "Alive and kicking!"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> PlainTextResponse:
+    """Performance metrics, in Prometheus' format"""
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+
 @app.get("/favicon.ico", include_in_schema=False)
 async def favicon() -> FileResponse:
     return FileResponse("favicon.ico")
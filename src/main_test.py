@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict
+
+from src.test_utils import benchmark
+
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET") or 1.0)
+"""Seconds `import src.main` may take, which every worker pays on
+startup. It takes about 0.9s, and 1.05s loading boto3 eagerly"""
+IMPORT_TIME_RUNS = 5
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import src.main
+elapsed = time.perf_counter() - start
+print(json.dumps({"time": elapsed, "boto3": "boto3" in sys.modules}))
+"""
+
+
+def import_main() -> Dict[str, Any]:
+    # a new interpreter, as this one has already imported everything
+    env = {
+        **os.environ,
+        "AWS_ACCESS_KEY_ID": "key",
+        "AWS_SECRET_ACCESS_KEY": "secret",
+        "SQS_QUEUE_URL": "https://sqs.us-east-1.amazonaws.com/1/q.fifo",
+    }
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        env=env,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    result: Dict[str, Any] = json.loads(out.splitlines()[-1])
+    return result
+
+
+def test_import_does_not_load_boto3() -> None:
+    # the queue's client is created when the first report is sent
+    assert not import_main()["boto3"]
+
+
+@benchmark
+def test_import_time() -> None:
+    """Measures how long importing the app takes, with the metrics queue
+    configured. Run in CI by `make import-time`."""
+    best = min(import_main()["time"] for _ in range(IMPORT_TIME_RUNS))
+
+    print(
+        f"\nimport src.main: {best * 1e3:.0f}ms"
+        f" (budget {IMPORT_TIME_BUDGET * 1e3:.0f}ms)"
+    )
+    assert best < IMPORT_TIME_BUDGET
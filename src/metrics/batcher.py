@@ -0,0 +1,137 @@
+import asyncio
+from typing import TYPE_CHECKING, List, Literal, Optional
+
+from src.logging import error, warn
+from src.metrics.queue import ReportQueue
+
+if TYPE_CHECKING:
+    from mypy_boto3_sqs.type_defs import SendMessageBatchRequestEntryTypeDef
+
+
+MAX_BATCH_SIZE = 10
+"""Maximum amount of messages in a single SQS SendMessageBatch call"""
+MAX_BATCH_BYTES = 256 * 1024
+"""Maximum size of a SendMessageBatch call's messages, added up. It's also
+the maximum size of a single message"""
+
+OverflowPolicy = Literal["drop_oldest", "drop_newest"]
+
+
+class ReportBatcher:
+    """Buffers report messages in memory and sends them to the queue in
+    batches, from a background task.
+
+    Adding a message never blocks. When the buffer is full, either the
+    oldest buffered message or the new one is dropped, depending on the
+    overflow policy.
+    """
+
+    def __init__(
+        self,
+        queue: ReportQueue,
+        maxsize: int,
+        flush_interval: float,
+        overflow_policy: OverflowPolicy,
+    ) -> None:
+        self.queue = queue
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.dropped = 0
+        self._buffer: asyncio.Queue[str] = asyncio.Queue(maxsize)
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def qsize(self) -> int:
+        return self._buffer.qsize()
+
+    def put(self, body: str) -> None:
+        """Buffers the message to be sent in the next batch"""
+        if self._buffer.full():
+            self.dropped += 1
+
+            if self.overflow_policy == "drop_newest":
+                warn("Metrics buffer is full, dropping new report")
+                return
+
+            warn("Metrics buffer is full, dropping oldest report")
+            self._buffer.get_nowait()
+
+        self._buffer.put_nowait(body)
+
+        if self._buffer.qsize() >= MAX_BATCH_SIZE:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        """Starts sending buffered messages in the background"""
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops the background task, after sending all buffered messages"""
+        if self._task is None:
+            return
+
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+
+            self._wakeup.clear()
+            await self.flush()
+
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Sends all buffered messages, in batches within SQS' limits"""
+        batch: List[str] = []
+        size = 0
+
+        while not self._buffer.empty():
+            body = self._buffer.get_nowait()
+            body_size = len(body.encode())
+
+            if body_size > MAX_BATCH_BYTES:
+                error(f"Dropping report of {body_size} bytes, too large")
+                continue
+
+            if batch and (
+                len(batch) == MAX_BATCH_SIZE
+                or size + body_size > MAX_BATCH_BYTES
+            ):
+                await self._send(batch)
+                batch, size = [], 0
+
+            batch.append(body)
+            size += body_size
+
+        if batch:
+            await self._send(batch)
+
+    async def _send(self, batch: List[str]) -> None:
+        entries: List["SendMessageBatchRequestEntryTypeDef"] = [
+            {"Id": str(i), "MessageBody": body} for i, body in enumerate(batch)
+        ]
+
+        try:
+            # boto3 is synchronous, so we run it outside the event loop
+            res = await asyncio.to_thread(
+                self.queue.send_messages, Entries=entries
+            )
+        except Exception as e:
+            error(f"Failed to send {len(batch)} reports: {e}")
+            return
+
+        failed = res["Failed"] if res is not None else []
+
+        for failure in failed:
+            error(f"Failed to send report: {failure}")
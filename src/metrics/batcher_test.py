@@ -0,0 +1,79 @@
+import asyncio
+
+from src.metrics.batcher import MAX_BATCH_BYTES, OverflowPolicy, ReportBatcher
+from src.metrics.logging_queue import LoggingQueue
+from src.test_utils import RecordingQueue
+
+
+def make_batcher(
+    maxsize: int = 100,
+    flush_interval: float = 60,
+    policy: OverflowPolicy = "drop_oldest",
+) -> tuple[ReportBatcher, RecordingQueue]:
+    queue = RecordingQueue()
+    return ReportBatcher(queue, maxsize, flush_interval, policy), queue
+
+
+async def test_batcher_sends_in_batches_on_stop() -> None:
+    batcher, queue = make_batcher()
+    batcher.start()
+
+    for i in range(25):
+        batcher.put(str(i))
+
+    await batcher.stop()
+
+    assert [len(b) for b in queue.batches] == [10, 10, 5]
+    assert sum(queue.batches, []) == [str(i) for i in range(25)]
+
+
+async def test_batcher_splits_large_batches() -> None:
+    batcher, queue = make_batcher()
+    report = "x" * (MAX_BATCH_BYTES // 3 + 1)
+
+    for body in [report] * 5 + ["small", "y" * (MAX_BATCH_BYTES + 1)]:
+        batcher.put(body)
+    await batcher.flush()
+
+    # three large reports would go over the request size limit, and a
+    # report over it can't be sent at all
+    assert [len(b) for b in queue.batches] == [2, 2, 2]
+    assert queue.batches[-1] == [report, "small"]
+    for batch in queue.batches:
+        assert sum(len(body.encode()) for body in batch) <= MAX_BATCH_BYTES
+
+
+async def test_batcher_flushes_periodically() -> None:
+    batcher, queue = make_batcher(flush_interval=0.01)
+    batcher.start()
+
+    batcher.put("report")
+    await asyncio.sleep(0.1)
+
+    assert queue.batches == [["report"]]
+    await batcher.stop()
+
+
+async def test_batcher_overflow_policies() -> None:
+    batcher, queue = make_batcher(maxsize=2, policy="drop_oldest")
+    for body in ["1", "2", "3"]:
+        batcher.put(body)
+    await batcher.flush()
+    assert queue.batches == [["2", "3"]]
+    assert batcher.dropped == 1
+
+    batcher, queue = make_batcher(maxsize=2, policy="drop_newest")
+    for body in ["1", "2", "3"]:
+        batcher.put(body)
+    await batcher.flush()
+    assert queue.batches == [["1", "2"]]
+    assert batcher.dropped == 1
+
+
+async def test_batcher_with_logging_queue() -> None:
+    batcher = ReportBatcher(LoggingQueue(), 100, 60, "drop_oldest")
+    batcher.start()
+    batcher.put("report")
+    await batcher.stop()
+
+    assert batcher.qsize() == 0
@@ -6,3 +6,15 @@ AWS_SECRET_ACCESS_KEY = os.environ.get("AWS_SECRET_ACCESS_KEY") or ""
 
 # Name of the queue
 SQS_QUEUE_URL = os.environ.get("SQS_QUEUE_URL") or ""
+
+# Amount of reports buffered in memory while waiting to be sent
+METRICS_BUFFER_SIZE = int(os.environ.get("METRICS_BUFFER_SIZE") or 1000)
+
+# Maximum time (in seconds) a report waits in the buffer before being sent
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL") or 1)
+
+# Which report gets dropped when the buffer is full. Either the oldest
+# buffered one ("drop_oldest") or the new one ("drop_newest")
+METRICS_OVERFLOW_POLICY = (
+    os.environ.get("METRICS_OVERFLOW_POLICY") or "drop_oldest"
+)
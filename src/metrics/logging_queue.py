@@ -1,8 +1,13 @@
-from typing import Mapping
-from mypy_boto3_sqs.type_defs import MessageAttributeValueTypeDef
+from typing import TYPE_CHECKING, Mapping, Sequence
 
 from src.logging import info
 
+if TYPE_CHECKING:
+    from mypy_boto3_sqs.type_defs import (
+        MessageAttributeValueTypeDef,
+        SendMessageBatchRequestEntryTypeDef,
+    )
+
 
 class LoggingQueue:
     url: str = "https://sqs.ex-north-x.amazonaws.example.com/xx/TestQueue.fifo"
@@ -10,7 +15,7 @@ class LoggingQueue:
     def send_message(
         self,
         MessageBody: str = "",
-        MessageAttributes: Mapping[str, MessageAttributeValueTypeDef] = {},
+        MessageAttributes: Mapping[str, "MessageAttributeValueTypeDef"] = {},
         MessageDeduplicationId: str = "",
         MessageGroupId: str = "",
     ) -> None:
@@ -21,3 +26,10 @@ class LoggingQueue:
             "MessageGroupId": MessageGroupId,
         }
         info(str(msg))
+
+    def send_messages(
+        self,
+        Entries: Sequence["SendMessageBatchRequestEntryTypeDef"] = [],
+    ) -> None:
+        for entry in Entries:
+            info(str(entry))
@@ -1,7 +1,12 @@
-from typing import Union
-from boto3.session import Session
-from mypy_boto3_sqs import SQSServiceResource
-from mypy_boto3_sqs.service_resource import Queue
+import threading
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Optional,
+    Protocol,
+    Sequence,
+    Union,
+)
 
 from src.metrics.config import (
     AWS_ACCESS_KEY_ID,
@@ -10,6 +15,26 @@ from src.metrics.config import (
 )
 from src.metrics.logging_queue import LoggingQueue
 
+if TYPE_CHECKING:
+    # the stubs import boto3, which takes a while to import. It's only
+    # needed once the first report is sent
+    from mypy_boto3_sqs import SQSServiceResource
+    from mypy_boto3_sqs.service_resource import Queue
+    from mypy_boto3_sqs.type_defs import (
+        SendMessageBatchRequestEntryTypeDef,
+        SendMessageBatchResultTypeDef,
+    )
+
+
+class ReportQueue(Protocol):
+    """Where the reports are sent. Implemented by SQS queues and
+    `LoggingQueue`"""
+
+    def send_messages(
+        self, *, Entries: Sequence["SendMessageBatchRequestEntryTypeDef"]
+    ) -> Optional["SendMessageBatchResultTypeDef"]:
+        ...
+
 
 def env_was_initialized() -> bool:
     return (
@@ -19,9 +44,11 @@ def env_was_initialized() -> bool:
     )
 
 
-def get_aws_queue() -> Queue:
+def get_aws_queue() -> "Queue":
     assert env_was_initialized()
 
+    from boto3.session import Session
+
     # Initiate session
     session = Session(
         aws_access_key_id=AWS_ACCESS_KEY_ID,
@@ -32,7 +59,7 @@ def get_aws_queue() -> Queue:
     sqs_region = SQS_QUEUE_URL.split(".")[1]
 
     # Create SQS resource
-    sqs: SQSServiceResource = session.resource("sqs", region_name=sqs_region)
+    sqs: "SQSServiceResource" = session.resource("sqs", region_name=sqs_region)
 
     # Get queue by name
     queue = sqs.Queue(SQS_QUEUE_URL)
@@ -40,6 +67,28 @@ def get_aws_queue() -> Queue:
     return queue
 
 
-QUEUE: Union[Queue, LoggingQueue] = (
-    get_aws_queue() if env_was_initialized() else LoggingQueue()
+class LazyQueue:
+    """Creates the queue when the first messages are sent, so workers
+    don't pay for it on startup"""
+
+    def __init__(self, factory: Callable[[], ReportQueue]) -> None:
+        self.factory = factory
+        self._queue: Optional[ReportQueue] = None
+        # messages are sent from worker threads
+        self._lock = threading.Lock()
+
+    def get(self) -> ReportQueue:
+        with self._lock:
+            if self._queue is None:
+                self._queue = self.factory()
+            return self._queue
+
+    def send_messages(
+        self, *, Entries: Sequence["SendMessageBatchRequestEntryTypeDef"]
+    ) -> Optional["SendMessageBatchResultTypeDef"]:
+        return self.get().send_messages(Entries=Entries)
+
+
+QUEUE: Union[LazyQueue, LoggingQueue] = (
+    LazyQueue(get_aws_queue) if env_was_initialized() else LoggingQueue()
 )
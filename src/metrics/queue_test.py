@@ -0,0 +1,21 @@
+from typing import List
+
+from src.metrics.queue import LazyQueue
+from src.test_utils import RecordingQueue
+
+
+def test_lazy_queue_is_created_on_first_send() -> None:
+    created: List[RecordingQueue] = []
+
+    def factory() -> RecordingQueue:
+        created.append(RecordingQueue())
+        return created[-1]
+
+    queue = LazyQueue(factory)
+    assert created == []
+
+    queue.send_messages(Entries=[{"Id": "0", "MessageBody": "1"}])
+    queue.send_messages(Entries=[{"Id": "0", "MessageBody": "2"}])
+
+    assert len(created) == 1
+    assert created[0].batches == [["1"], ["2"]]
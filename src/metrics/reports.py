@@ -4,12 +4,28 @@ from typing import Any, Callable, Dict
 from pydantic import BaseModel
 from src.api.model.training import Training
 
+from src.metrics.batcher import ReportBatcher
+from src.metrics.config import (
+    METRICS_BUFFER_SIZE,
+    METRICS_FLUSH_INTERVAL,
+    METRICS_OVERFLOW_POLICY,
+)
 from src.metrics.queue import QUEUE
 
 
 MESSAGE_GROUP_ID = "metrics"
 SERVICE_NAME = "trainings"
 
+REPORTS = ReportBatcher(
+    QUEUE,
+    METRICS_BUFFER_SIZE,
+    METRICS_FLUSH_INTERVAL,
+    "drop_newest"
+    if METRICS_OVERFLOW_POLICY == "drop_newest"
+    else "drop_oldest",
+)
+"""Sends the reports in the background. Started in the app's lifespan"""
+
 
 class Report(BaseModel):
     service: str = SERVICE_NAME
@@ -29,9 +45,7 @@ class TrainingCreatedReport(Report):
 def report_training_created(training: Training) -> None:
     body = TrainingCreatedReport.from_now(training).json()
 
-    _ = QUEUE.send_message(
-        MessageBody=body,
-    )
+    REPORTS.put(body)
 
 
 class TrainingFavoritedReport(Report):
@@ -46,9 +60,7 @@ class TrainingFavoritedReport(Report):
 def report_training_favorited(user_id: int, training_id: int) -> None:
     body = TrainingFavoritedReport.from_now(user_id, training_id).json()
 
-    _ = QUEUE.send_message(
-        MessageBody=body,
-    )
+    REPORTS.put(body)
 
 
 def get_training_creation_reporter() -> Callable[[Training], None]:
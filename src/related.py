@@ -0,0 +1,354 @@
+import asyncio
+import heapq
+import json
+import os
+from bisect import insort
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from src.db.model.favorite import DBFavorite
+from src.db.session import SessionLocal
+from src.logging import error, info
+
+
+RELATED_TOP_K = int(os.getenv("RELATED_TOP_K") or 20)
+"""Related trainings kept for each training"""
+RELATED_MAX_FAVORITES = int(os.getenv("RELATED_MAX_FAVORITES") or 100)
+"""Latest favorites of each user that are counted"""
+RELATED_SNAPSHOT_PATH = os.getenv("RELATED_SNAPSHOT_PATH")
+"""File where the index is saved, to load it on startup. None disables
+the snapshots"""
+RELATED_SNAPSHOT_INTERVAL = float(
+    os.getenv("RELATED_SNAPSHOT_INTERVAL") or 300
+)
+RELATED_REBUILD_INTERVAL = float(os.getenv("RELATED_REBUILD_INTERVAL") or 3600)
+"""Seconds between rebuilds from the database. Each replica only sees its
+own favorites, so this bounds how far apart they drift"""
+
+BUILD_BATCH_SIZE = 1000
+BUILD_RETRY_DELAY = 10
+
+
+class Cooccurrences:
+    """How many users favorited each pair of trainings, and each
+    training's top `k` co-favorited trainings.
+
+    Counts are sparse: pairs that were never favorited together take no
+    memory. Adding a favorite changes the counts of the pairs it forms with
+    the user's other favorites, and each top `k` is updated from the count
+    that changed, so it costs O(max_favorites * k). Removing a favorite is
+    as cheap, but for trainings whose top `k` it leaves with others that
+    could take its place, which are recounted.
+
+    Only the latest `max_favorites` favorites of each user are counted, so
+    a user adds at most `max_favorites`^2 pair counts, however many trainings
+    they favorite. Memory is O(users * max_favorites^2) at worst.
+    """
+
+    def __init__(self, k: int, max_favorites: int) -> None:
+        self.k = k
+        self.max_favorites = max_favorites
+        # each user's counted favorites, oldest first
+        self.favorites: Dict[int, Dict[int, None]] = {}
+        self.counts: Dict[int, Dict[int, int]] = {}
+        # best first: most co-favorited, then newest
+        self.top: Dict[int, List[int]] = {}
+
+    def related(self, training_id: int, limit: int) -> List[int]:
+        return self.top.get(training_id, [])[:limit]
+
+    def add(
+        self, user_id: int, training_id: int, refresh: bool = True
+    ) -> None:
+        favorites = self.favorites.setdefault(user_id, {})
+
+        if training_id in favorites:
+            return
+
+        if len(favorites) >= self.max_favorites:
+            self.remove(user_id, next(iter(favorites)), refresh)
+
+        for other in favorites:
+            self._add_pair(training_id, other, 1, refresh)
+
+        favorites[training_id] = None
+
+    def remove(
+        self, user_id: int, training_id: int, refresh: bool = True
+    ) -> None:
+        favorites = self.favorites.get(user_id, {})
+
+        if training_id not in favorites:
+            return
+
+        del favorites[training_id]
+
+        for other in favorites:
+            self._add_pair(training_id, other, -1, refresh)
+
+    def refresh_top(self, training_id: int) -> None:
+        counts = self.counts.get(training_id)
+
+        if not counts:
+            self.top.pop(training_id, None)
+            return
+
+        best = heapq.nlargest(self.k, counts.items(), key=lambda c: c[::-1])
+        self.top[training_id] = [other for other, _ in best]
+
+    def refresh_all(self) -> None:
+        for training_id in self.counts:
+            self.refresh_top(training_id)
+
+    def _add_pair(
+        self, training_id: int, other: int, amount: int, refresh: bool
+    ) -> None:
+        for a, b in [(training_id, other), (other, training_id)]:
+            self._add_count(a, b, amount)
+            if refresh:
+                self._update_top(a, b, amount > 0)
+
+    def _add_count(self, training_id: int, other: int, amount: int) -> None:
+        counts = self.counts.setdefault(training_id, {})
+        count = counts.get(other, 0) + amount
+
+        if count > 0:
+            counts[other] = count
+        else:
+            counts.pop(other, None)
+
+    def _update_top(self, training_id: int, other: int, added: bool) -> None:
+        """Updates the training's top `k` after its count with `other`
+        changed by one"""
+        counts = self.counts.get(training_id, {})
+        top = self.top.get(training_id, [])
+
+        def key(t: int) -> Tuple[int, int]:
+            return (-counts[t], -t)
+
+        if added:
+            if other in top:
+                top.remove(other)
+            elif len(top) >= self.k:
+                # it only gets in if it beats the last one
+                if key(other) > key(top[-1]):
+                    return
+                top.pop()
+        else:
+            if other not in top:
+                # it was already out, and it only went down
+                return
+
+            top.remove(other)
+            if len(counts) - (other in counts) > len(top):
+                # some training out of the top could take its place
+                self.refresh_top(training_id)
+                return
+
+        if other in counts:
+            insort(top, other, key=key)
+
+        if top:
+            self.top[training_id] = top
+        else:
+            self.top.pop(training_id, None)
+
+    def to_json(self) -> Dict[str, Any]:
+        # the counts are rebuilt from the favorites when loading, so the
+        # snapshot is O(users * max_favorites)
+        return {
+            "k": self.k,
+            "max_favorites": self.max_favorites,
+            "favorites": {u: list(f) for u, f in self.favorites.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "Cooccurrences":
+        cooccurrences = cls(data["k"], data["max_favorites"])
+
+        for user_id, favorites in data["favorites"].items():
+            for training_id in favorites:
+                cooccurrences.add(int(user_id), training_id, refresh=False)
+
+        cooccurrences.refresh_all()
+        return cooccurrences
+
+
+class RelatedIndex:
+    """Keeps the favorites' co-occurrences in memory, for recommendations.
+
+    The index is built from the database in a background task, and kept up
+    to date by `add` and `remove`. It's saved periodically to a snapshot,
+    which is loaded on startup so it's ready without waiting for a build.
+    """
+
+    def __init__(
+        self,
+        k: int,
+        max_favorites: int,
+        snapshot_path: Optional[str],
+        snapshot_interval: float,
+        rebuild_interval: float,
+    ) -> None:
+        self.k = k
+        self.max_favorites = max_favorites
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.rebuild_interval = rebuild_interval
+        self.ready = asyncio.Event()
+        self._cooccurrences = Cooccurrences(k, max_favorites)
+        # changes made while rebuilding, replayed on the rebuilt index
+        self._pending: Optional[List[Tuple[int, int, bool]]] = None
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def related(self, training_id: int, limit: int) -> List[int]:
+        """IDs of the trainings most often favorited together with the
+        given one, best first"""
+        return self._cooccurrences.related(training_id, limit)
+
+    def add(self, user_id: int, training_id: int) -> None:
+        self._change(user_id, training_id, True)
+
+    def remove(self, user_id: int, training_id: int) -> None:
+        self._change(user_id, training_id, False)
+
+    def _change(self, user_id: int, training_id: int, added: bool) -> None:
+        if self._pending is not None:
+            self._pending.append((user_id, training_id, added))
+
+        if added:
+            self._cooccurrences.add(user_id, training_id)
+        else:
+            self._cooccurrences.remove(user_id, training_id)
+
+    def start(self) -> None:
+        """Loads the snapshot, and starts maintaining the index in the
+        background"""
+        self.ready = asyncio.Event()
+        self._cooccurrences = Cooccurrences(self.k, self.max_favorites)
+
+        if self.load_snapshot():
+            self.ready.set()
+
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops the background task, and saves a last snapshot"""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        await self.save_snapshot()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_rebuild = loop.time()
+
+        while True:
+            if loop.time() >= next_rebuild:
+                try:
+                    await self.rebuild()
+                    next_rebuild = loop.time() + self.rebuild_interval
+                except Exception as e:
+                    error(f"Failed to build the related trainings: {e}")
+                    next_rebuild = loop.time() + BUILD_RETRY_DELAY
+
+            await asyncio.sleep(
+                min(self.snapshot_interval, next_rebuild - loop.time())
+            )
+            await self.save_snapshot()
+
+    async def rebuild(self) -> None:
+        """Builds the index again from the favorites in the database"""
+        cooccurrences = Cooccurrences(self.k, self.max_favorites)
+        self._pending = []
+
+        try:
+            async with SessionLocal() as session:
+                query = (
+                    select(DBFavorite.user_id, DBFavorite.training_id)
+                    # in the order they were added, so the latest are kept
+                    .order_by(
+                        DBFavorite.user_id, DBFavorite.id
+                    ).execution_options(yield_per=BUILD_BATCH_SIZE)
+                )
+                result = await session.stream(query)
+
+                async for rows in result.partitions():
+                    for user_id, training_id in rows:
+                        cooccurrences.add(user_id, training_id, refresh=False)
+                    # let requests in between batches
+                    await asyncio.sleep(0)
+
+            cooccurrences.refresh_all()
+
+            for user_id, training_id, added in self._pending:
+                if added:
+                    cooccurrences.add(user_id, training_id)
+                else:
+                    cooccurrences.remove(user_id, training_id)
+        finally:
+            self._pending = None
+
+        self._cooccurrences = cooccurrences
+        self.ready.set()
+        info(f"Related trainings built for {len(cooccurrences.top)} trainings")
+
+    def load_snapshot(self) -> bool:
+        if self.snapshot_path is None or not os.path.exists(
+            self.snapshot_path
+        ):
+            return False
+
+        try:
+            with open(self.snapshot_path) as f:
+                data = json.load(f)
+
+            if (
+                data["k"] != self.k
+                or data["max_favorites"] != self.max_favorites
+            ):
+                return False
+
+            self._cooccurrences = Cooccurrences.from_json(data)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            error(f"Failed to load the related trainings snapshot: {e}")
+            return False
+
+        return True
+
+    async def save_snapshot(self) -> None:
+        if self.snapshot_path is None or not self.ready.is_set():
+            return
+
+        # copied in the event loop, as it's being changed in it. Only the
+        # favorites are, so it's as large as the favorites table
+        data = self._cooccurrences.to_json()
+        try:
+            await asyncio.to_thread(_write_json, self.snapshot_path, data)
+        except OSError as e:
+            error(f"Failed to save the related trainings snapshot: {e}")
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    # written aside and then moved, so a crash never leaves half a snapshot
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(data, f)
+    os.replace(f"{path}.tmp", path)
+
+
+RELATED = RelatedIndex(
+    RELATED_TOP_K,
+    RELATED_MAX_FAVORITES,
+    RELATED_SNAPSHOT_PATH,
+    RELATED_SNAPSHOT_INTERVAL,
+    RELATED_REBUILD_INTERVAL,
+)
+"""Co-favorited trainings. Started in the app's lifespan"""
@@ -0,0 +1,116 @@
+import json
+import random
+from http import HTTPStatus
+from pathlib import Path
+
+from httpx import AsyncClient
+
+from src.related import RELATED, Cooccurrences, RelatedIndex
+from src.test_utils import as_user, create_trainings, get_training_ids, post_as
+
+
+def test_cooccurrences() -> None:
+    cooccurrences = Cooccurrences(k=2, max_favorites=10)
+
+    for user, trainings in [(1, [1, 2, 3]), (2, [1, 2]), (3, [1, 4])]:
+        for training in trainings:
+            cooccurrences.add(user, training)
+    cooccurrences.add(1, 1)  # already favorited
+
+    assert cooccurrences.counts[1] == {2: 2, 3: 1, 4: 1}
+    # ties go to the newest training, and only k are kept
+    assert cooccurrences.related(1, 10) == [2, 4]
+    assert cooccurrences.related(1, 1) == [2]
+    assert cooccurrences.related(2, 10) == [1, 3]
+    assert cooccurrences.related(5, 10) == []
+
+    cooccurrences.remove(2, 2)
+    cooccurrences.remove(2, 2)  # not favorited anymore
+    assert cooccurrences.counts[1] == {2: 1, 3: 1, 4: 1}
+    assert cooccurrences.related(1, 10) == [4, 3]
+
+    cooccurrences.remove(3, 4)
+    assert 4 not in cooccurrences.counts[1]
+    assert cooccurrences.related(4, 10) == []
+
+
+def test_cooccurrences_top_is_kept_up_to_date() -> None:
+    rng = random.Random(0)
+    cooccurrences = Cooccurrences(k=3, max_favorites=5)
+
+    for _ in range(1000):
+        user, training = rng.randint(1, 10), rng.randint(1, 15)
+        if rng.random() < 0.7:
+            cooccurrences.add(user, training)
+        else:
+            cooccurrences.remove(user, training)
+
+        # the same as computing every top k from scratch
+        expected = Cooccurrences(k=3, max_favorites=5)
+        expected.counts = cooccurrences.counts
+        expected.refresh_all()
+        assert cooccurrences.top == expected.top
+
+
+def test_cooccurrences_max_favorites() -> None:
+    cooccurrences = Cooccurrences(k=10, max_favorites=3)
+
+    for training in range(1, 101):
+        cooccurrences.add(1, training)
+
+    # only the pairs of the latest 3 favorites are counted
+    assert list(cooccurrences.favorites[1]) == [98, 99, 100]
+    assert sum(len(c) for c in cooccurrences.counts.values()) == 3 * 2
+    assert cooccurrences.related(100, 10) == [99, 98]
+    assert cooccurrences.related(1, 10) == []
+
+
+async def test_snapshot(tmp_path: Path) -> None:
+    path = str(tmp_path / "related.json")
+    index = RelatedIndex(2, 10, path, 300, 3600)
+    index.ready.set()
+    index.add(1, 1)
+    index.add(1, 2)
+    await index.save_snapshot()
+
+    loaded = RelatedIndex(2, 10, path, 300, 3600)
+    assert loaded.load_snapshot()
+    assert loaded.related(1, 10) == [2]
+    assert loaded.related(2, 10) == [1]
+
+    # snapshots of another k are ignored
+    assert not RelatedIndex(3, 10, path, 300, 3600).load_snapshot()
+
+    with open(path, "w") as f:
+        json.dump({"broken": True}, f)
+    assert not RelatedIndex(2, 10, path, 300, 3600).load_snapshot()
+
+
+async def test_related_trainings(client: AsyncClient) -> None:
+    await RELATED.ready.wait()
+    a, b, c, d = await create_trainings(client, 4)
+
+    related_to_a = f"/trainings/{a.id}/related"
+
+    for user, trainings in [(1, [a, b, c]), (2, [a, b]), (3, [d])]:
+        for training in trainings:
+            body = {"training_id": training.id}
+            await post_as(client, user, "/favorites", body)
+
+    assert await get_training_ids(client, related_to_a) == [b.id, c.id]
+    related_to_d = f"/trainings/{d.id}/related"
+    assert await get_training_ids(client, related_to_d) == []
+
+    response = await client.delete(f"/favorites/{d.id}")
+    assert response.status_code == HTTPStatus.OK
+    as_user(2)
+    response = await client.delete(f"/favorites/{b.id}")
+    assert response.status_code == HTTPStatus.OK
+    assert await get_training_ids(client, related_to_a) == [c.id, b.id]
+
+    # rebuilding from the database gives the same index
+    await RELATED.rebuild()
+    assert await get_training_ids(client, related_to_a) == [c.id, b.id]
+
+    response = await client.get("/trainings/100/related")
+    assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,345 @@
+import os
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Engine, event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.logging import warn
+from src.metrics.reports import REPORTS
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+"""Prometheus' text exposition format"""
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+)
+STATEMENT_TYPES = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+QUERY_STATS_HEADERS = (os.getenv("QUERY_STATS_HEADERS") or "false") == "true"
+"""Whether to report each request's statements in its response headers"""
+STATEMENTS_HEADER = "X-DB-Statements"
+DB_TIME_HEADER = "X-DB-Time"
+
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET") or 10)
+"""Statements a request may execute before a warning is logged"""
+ROUTE_QUERY_BUDGETS: Dict[str, Optional[int]] = {
+    "GET /trainings": 4,
+    "GET /trainings/count": 1,
+    "GET /trainings/{id}": 4,
+    "GET /trainings/top": 3,
+    "GET /trainings/popular": 3,
+    "GET /trainings/{id}/related": 3,
+    "GET /favorites": 4,
+    # one query per chunk, so it grows with the catalogue
+    "GET /trainings/export": None,
+}
+"""Budgets that replace `QUERY_BUDGET` for some routes, by method and
+route template. `None` means unbounded"""
+
+METRICS: List["Metric"] = []
+"""All the metrics exposed by the service"""
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if len(names) == 0:
+        return ""
+
+    pairs = (
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+        METRICS.append(self)
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        ...
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type}"
+        yield from self.samples()
+
+
+class Gauge(Metric):
+    """Value that goes up and down. If a callback is given, the value is
+    read from it when rendering"""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        callback: Optional[Callable[[], float]] = None,
+    ) -> None:
+        super().__init__(name, help)
+        self.value = 0.0
+        self.callback = callback
+
+    def inc(self) -> None:
+        self.value += 1
+
+    def dec(self) -> None:
+        self.value -= 1
+
+    def samples(self) -> Iterator[str]:
+        value = self.value if self.callback is None else self.callback()
+        yield f"{self.name} {value}"
+
+
+class CallbackCounter(Metric):
+    """Monotonic total, kept elsewhere and read when rendering"""
+
+    type = "counter"
+
+    def __init__(
+        self, name: str, help: str, callback: Callable[[], float]
+    ) -> None:
+        super().__init__(name, help)
+        self.callback = callback
+
+    def samples(self) -> Iterator[str]:
+        yield f"{self.name} {self.callback()}"
+
+
+class Histogram(Metric):
+    """Distribution of observed values, by label values.
+
+    Observing only increments a bucket, so it's cheap enough for every
+    request and statement. Buckets are made cumulative when rendering.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Tuple[str, ...],
+        buckets: Tuple[float, ...],
+    ) -> None:
+        super().__init__(name, help)
+        self.labels = labels
+        self.buckets = buckets
+        # per label values: each bucket's count, the +Inf bucket's, and sum
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+
+        if series is None:
+            series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterator[str]:
+        for values, series in self._series.items():
+            cumulative = 0.0
+
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                labels = _labels((*self.labels, "le"), (*values, str(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+
+            labels = _labels(self.labels, values)
+            yield f"{self.name}_sum{labels} {series[-1]}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+def render_metrics() -> str:
+    return "\n".join(line for m in METRICS for line in m.render()) + "\n"
+
+
+# -------------
+# HTTP requests
+# -------------
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling requests, by route template",
+    ("method", "route", "status"),
+    REQUEST_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being handled"
+)
+
+
+@dataclass
+class RequestQueries:
+    """Statements executed while handling a single request"""
+
+    statements: int = 0
+    time: float = 0.0
+
+
+current_queries: ContextVar[Optional[RequestQueries]] = ContextVar(
+    "current_queries", default=None
+)
+"""The statements of the request being handled, if any"""
+
+
+def query_budget(route: str) -> Optional[int]:
+    return ROUTE_QUERY_BUDGETS.get(route, QUERY_BUDGET)
+
+
+def check_query_budget(route: str, queries: RequestQueries) -> None:
+    budget = query_budget(route)
+
+    if budget is not None and queries.statements > budget:
+        warn(
+            f"Query budget exceeded by {route}: {queries.statements}"
+            f" statements (budget {budget}) in {queries.time * 1000:.1f}ms"
+        )
+
+
+class RequestMetricsMiddleware:
+    """Measures every HTTP request, and the statements it executes"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        queries = RequestQueries()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+                if QUERY_STATS_HEADERS:
+                    # statements executed while streaming the body are
+                    # left out, they only count towards the budget
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (
+                            STATEMENTS_HEADER.lower().encode(),
+                            str(queries.statements).encode(),
+                        ),
+                        (
+                            DB_TIME_HEADER.lower().encode(),
+                            f"{queries.time * 1000:.3f}".encode(),
+                        ),
+                    ]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        token = current_queries.set(queries)
+        start = perf_counter()
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_queries.reset(token)
+            REQUESTS_IN_FLIGHT.dec()
+            # the router leaves the matched route in the scope. Raw paths
+            # would make a new series for every ID
+            route = scope.get("route")
+            template = getattr(route, "path", "unmatched")
+            REQUEST_DURATION.observe(
+                perf_counter() - start, scope["method"], template, str(status)
+            )
+            check_query_budget(f"{scope['method']} {template}", queries)
+
+
+# -------------------
+# Database statements
+# -------------------
+
+
+STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds",
+    "Time spent executing database statements, by statement type",
+    ("type",),
+    STATEMENT_BUCKETS,
+)
+
+
+def statement_type(statement: str) -> str:
+    keyword = statement.lstrip()[:6].upper()
+    return keyword if keyword in STATEMENT_TYPES else "OTHER"
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Measures the duration of every statement executed by the engine,
+    and adds it to the current request's statements"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn: Any, *_: Any) -> None:
+        conn.info.setdefault("statement_start", []).append(perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_timer(conn: Any, _: Any, statement: str, *__: Any) -> None:
+        elapsed = perf_counter() - conn.info["statement_start"].pop()
+        STATEMENT_DURATION.observe(elapsed, statement_type(statement))
+
+        # the async engine runs this in a greenlet, which shares the
+        # context of the request's task
+        queries = current_queries.get()
+        if queries is not None:
+            queries.statements += 1
+            queries.time += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def drop_timer(context: Any) -> None:
+        if context.connection is None:
+            return
+
+        starts = context.connection.info.get("statement_start")
+        if starts:
+            starts.pop()
+
+
+# -------
+# Reports
+# -------
+
+
+REPORTS_QUEUED = Gauge(
+    "metrics_reports_queued",
+    "Reports waiting to be sent to the metrics queue",
+    lambda: REPORTS.qsize(),
+)
+REPORTS_DROPPED = CallbackCounter(
+    "metrics_reports_dropped_total",
+    "Reports dropped because the buffer was full",
+    lambda: REPORTS.dropped,
+)
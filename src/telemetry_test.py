@@ -0,0 +1,92 @@
+import pytest
+from http import HTTPStatus
+from typing import Dict, List
+from httpx import AsyncClient
+
+import src.telemetry as telemetry
+from src.api.model.training import Training
+from src.telemetry import (
+    DB_TIME_HEADER,
+    ROUTE_QUERY_BUDGETS,
+    Histogram,
+    statement_type,
+)
+from src.test_utils import request_statements
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    histogram = Histogram("test_seconds", "Test", ("path",), (0.1, 1))
+
+    for value in [0.05, 0.1, 0.5, 2]:
+        histogram.observe(value, "/a")
+
+    assert list(histogram.render()) == [
+        "# HELP test_seconds Test",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{path="/a",le="0.1"} 2.0',
+        'test_seconds_bucket{path="/a",le="1"} 3.0',
+        'test_seconds_bucket{path="/a",le="+Inf"} 4.0',
+        'test_seconds_sum{path="/a"} 2.65',
+        'test_seconds_count{path="/a"} 4.0',
+    ]
+
+
+def test_statement_type() -> None:
+    assert statement_type("SELECT trainings.id FROM trainings") == "SELECT"
+    assert statement_type("\n  insert into favorites") == "INSERT"
+    assert statement_type("PRAGMA foreign_keys=ON") == "OTHER"
+
+
+async def get_metrics(client: AsyncClient) -> Dict[str, str]:
+    response = await client.get("/metrics")
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"].startswith("text/plain")
+
+    samples = response.text.splitlines()
+    return dict(s.rsplit(" ", 1) for s in samples if not s.startswith("#"))
+
+
+async def test_metrics_endpoint(client: AsyncClient) -> None:
+    labels = 'method="GET",route="/trainings/{id}",status="404"'
+    requests = f"http_request_duration_seconds_count{{{labels}}}"
+    statements = 'db_statement_duration_seconds_count{type="SELECT"}'
+
+    before = await get_metrics(client)
+    response = await client.get("/trainings/1")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    after = await get_metrics(client)
+
+    assert float(after[requests]) == float(before.get(requests, 0)) + 1
+    assert float(after[statements]) > float(before.get(statements, 0))
+    assert after["http_requests_in_flight"] == "1.0"  # this request
+    assert after["metrics_reports_queued"] == "0"
+
+
+async def test_request_statements_header(
+    client: AsyncClient, created_body: Training
+) -> None:
+    response = await client.get(f"/trainings/{created_body.id}")
+    assert response.status_code == HTTPStatus.OK
+    assert request_statements(response) > 0
+    assert float(response.headers[DB_TIME_HEADER]) > 0
+
+    # now it's cached
+    response = await client.get(f"/trainings/{created_body.id}")
+    assert response.status_code == HTTPStatus.OK
+    assert request_statements(response) == 0
+
+
+async def test_query_budget_warning(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    warnings: List[str] = []
+    monkeypatch.setattr(telemetry, "warn", warnings.append)
+    monkeypatch.setitem(ROUTE_QUERY_BUDGETS, "GET /trainings/{id}", 0)
+
+    response = await client.get("/trainings/1")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+    assert len(warnings) == 1
+    assert warnings[0].startswith(
+        "Query budget exceeded by GET /trainings/{id}"
+    )
@@ -1,5 +1,42 @@
-from httpx import AsyncClient
+import os
+from contextlib import contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Generator,
+    List,
+    Sequence,
+    Tuple,
+)
+from httpx import AsyncClient, Response
 from http import HTTPStatus
+import pytest
+from sqlalchemy import event
+
+from src.api.model.training import (
+    CreateTraining,
+    Goal,
+    Multimedia,
+    Training,
+)
+from src.auth import User, get_user
+from src.common.model import TrainingType
+from src.db.session import engine
+from src.main import app
+from src.metrics.logging_queue import LoggingQueue
+from src.telemetry import STATEMENTS_HEADER
+
+if TYPE_CHECKING:
+    from mypy_boto3_sqs.type_defs import SendMessageBatchRequestEntryTypeDef
+
+RUN_BENCHMARKS = (os.getenv("RUN_BENCHMARKS") or "false") == "true"
+"""Whether to run the timing comparisons, which are too noisy for shared
+CI runners. See `make benchmark`"""
+
+benchmark = pytest.mark.skipif(
+    not RUN_BENCHMARKS, reason="set RUN_BENCHMARKS=true to run benchmarks"
+)
 
 
 async def assert_returns_empty(client: AsyncClient, url: str) -> None:
@@ -17,3 +54,88 @@ async def assert_score_is(
     assert response.status_code == HTTPStatus.OK
     assert response.json()["score"] == score
     assert response.json()["score_amount"] == score_amount
+
+
+def training_body(i: int) -> CreateTraining:
+    """Builds the i-th of a series of trainings with distinct titles"""
+    return CreateTraining(
+        title=f"training {i}",
+        description="description",
+        type=TrainingType.RUNNING,
+        difficulty=i % 10,
+        multimedia=[Multimedia("image_url")],
+        goals=[Goal(name="goal", description="description")],
+    )
+
+
+async def create_trainings(client: AsyncClient, amount: int) -> List[Training]:
+    """Creates `amount` trainings with distinct titles"""
+    trainings = []
+
+    for i in range(amount):
+        body = training_body(i)
+        response = await client.post("/trainings", json=body.dict())
+        assert response.status_code == HTTPStatus.CREATED
+        trainings.append(Training(**response.json()))
+
+    return trainings
+
+
+def as_user(user_id: int) -> User:
+    """Makes the next requests as the given user, who isn't an admin"""
+    user = User(email=f"{user_id}@example.com", sub=user_id, admin=False)
+    app.dependency_overrides[get_user] = lambda: user
+    return user
+
+
+async def post_as(
+    client: AsyncClient, user_id: int, url: str, json: Dict[str, Any]
+) -> None:
+    """POSTs as the given user, expecting something to be created"""
+    as_user(user_id)
+
+    response = await client.post(url, json=json)
+    assert response.status_code == HTTPStatus.CREATED
+
+
+async def get_training_ids(
+    client: AsyncClient, url: str, **params: Any
+) -> List[int]:
+    """IDs of the trainings listed by the endpoint, in order"""
+    response = await client.get(url, params=params)
+    assert response.status_code == HTTPStatus.OK
+    return [t["id"] for t in response.json()]
+
+
+@contextmanager
+def count_statements() -> Generator[List[Tuple[str, Any]], None, None]:
+    """Records every SQL statement (and its parameters) executed inside
+    the block"""
+    statements: List[Tuple[str, Any]] = []
+
+    def on_execute(*args: Any) -> None:
+        statements.append((args[2], args[3]))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", on_execute)
+
+
+def request_statements(response: Response) -> int:
+    """Amount of SQL statements executed to build the response"""
+    return int(response.headers[STATEMENTS_HEADER])
+
+
+class RecordingQueue(LoggingQueue):
+    """Metrics queue that keeps the bodies of each batch sent"""
+
+    def __init__(self) -> None:
+        self.batches: List[List[str]] = []
+
+    def send_messages(
+        self,
+        Entries: Sequence["SendMessageBatchRequestEntryTypeDef"] = [],
+    ) -> None:
+        self.batches.append([e["MessageBody"] for e in Entries])